@@ -0,0 +1,39 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.config import settings
+
+# Sync driver -> asyncio driver used for the same database
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.drivername)
+    return url.set(drivername=driver) if driver else url
+
+def create_engine_for(url: str):
+    """Create an asyncio engine with a pool sized for concurrent requests"""
+    url = to_async_url(url)
+    if url.get_backend_name() == "sqlite":
+        # SQLite serializes writers anyway; the dialect picks a suitable pool
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        pool_size=getattr(settings, "DB_POOL_SIZE", 20),
+        max_overflow=getattr(settings, "DB_MAX_OVERFLOW", 10),
+        pool_timeout=getattr(settings, "DB_POOL_TIMEOUT", 10),
+        pool_recycle=getattr(settings, "DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=True
+    )
+
+async_engine = create_engine_for(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -1,3 +1,8 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, Float, Boolean, DateTime, ForeignKey, JSON
+from sqlalchemy.orm import relationship
+from app.database import Base
+
 class Assessment(Base):
     __tablename__ = 'assessments'
 
@@ -20,6 +25,8 @@ class AssessmentQuestion(Base):
     correct_answer = Column(String(500))
     options = Column(JSON)  # For multiple choice questions
 
+    assessment = relationship("Assessment", back_populates="questions")
+
 class AssessmentAttempt(Base):
     __tablename__ = 'assessment_attempts'
 
@@ -29,4 +36,7 @@ class AssessmentAttempt(Base):
     score = Column(Float)
     completed = Column(Boolean, default=False)
     start_time = Column(DateTime, default=datetime.utcnow)
-    end_time = Column(DateTime)
\ No newline at end of file
+    end_time = Column(DateTime)
+    answers = Column(JSON)  # {question_id: answer}
+
+    assessment = relationship("Assessment", back_populates="attempts")
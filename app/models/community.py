@@ -1,10 +1,13 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class ForumTopic(Base):
     __tablename__ = 'forum_topics'
+    __table_args__ = (
+        Index('ix_forum_topics_category_last_reply', 'category', 'last_reply_at'),
+    )
 
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
@@ -12,12 +15,19 @@ class ForumTopic(Base):
     category = Column(String(50), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     author_id = Column(Integer, ForeignKey('users.id'))
-    
+    # Denormalized from topic_replies; updated in the same transaction as a reply
+    reply_count = Column(Integer, nullable=False, default=0)
+    # Creation time until the first reply; see forum.backfill_topic_activity
+    last_reply_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
     author = relationship("User", back_populates="topics")
     replies = relationship("TopicReply", back_populates="topic")
 
 class TopicReply(Base):
     __tablename__ = 'topic_replies'
+    __table_args__ = (
+        Index('ix_topic_replies_topic_created', 'topic_id', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
@@ -1,9 +1,20 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from typing import Iterable, Optional, Sequence, Set, Tuple
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import Base
 
+# Bulk checks above this many ids scan the consent type once instead of
+# issuing IN lookups chunk by chunk
+CONSENT_SCAN_THRESHOLD = 50000
+CONSENT_CHUNK = 1000
+
 class UserConsent(Base):
     __tablename__ = 'user_consents'
+    __table_args__ = (
+        Index('ix_user_consents_user_type', 'user_id', 'consent_type'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -14,10 +25,42 @@ class UserConsent(Base):
     ip_address = Column(String(45))
     user_agent = Column(String(200))
 
+# Current state derived from user_consents: a row exists exactly while the
+# user's latest consent of that type is granted and not revoked
+class CurrentConsent(Base):
+    __tablename__ = 'current_consents'
+
+    consent_type = Column(String(50), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    granted_at = Column(DateTime)
+
 class ConsentManager:
-    def __init__(self, db_session):
+    def __init__(self, db_session: AsyncSession):
         self.db = db_session
 
+    async def _grant(self, user_id: int, consent_type: str, granted_at: datetime):
+        try:
+            async with self.db.begin_nested():
+                self.db.add(CurrentConsent(
+                    consent_type=consent_type,
+                    user_id=user_id,
+                    granted_at=granted_at
+                ))
+        except IntegrityError:
+            await self.db.execute(
+                update(CurrentConsent)
+                .where(CurrentConsent.consent_type == consent_type, CurrentConsent.user_id == user_id)
+                .values(granted_at=granted_at)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def _withdraw(self, user_ids: Sequence[int], consent_type: str):
+        await self.db.execute(
+            delete(CurrentConsent)
+            .where(CurrentConsent.consent_type == consent_type, CurrentConsent.user_id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        )
+
     async def record_consent(self, user_id: int, consent_type: str, granted: bool,
                            ip_address: str, user_agent: str):
         consent = UserConsent(
@@ -29,15 +72,115 @@ class ConsentManager:
             user_agent=user_agent
         )
         self.db.add(consent)
+        if granted:
+            await self._grant(user_id, consent_type, consent.granted_at)
+        else:
+            await self._withdraw([user_id], consent_type)
         await self.db.commit()
 
     async def revoke_consent(self, user_id: int, consent_type: str):
-        consent = await self.db.query(UserConsent).filter(
-            UserConsent.user_id == user_id,
-            UserConsent.consent_type == consent_type,
-            UserConsent.revoked_at.is_(None)
-        ).first()
-        
-        if consent:
-            consent.revoked_at = datetime.utcnow()
-            await self.db.commit()
\ No newline at end of file
+        result = await self.db.execute(
+            update(UserConsent)
+            .where(
+                UserConsent.user_id == user_id,
+                UserConsent.consent_type == consent_type,
+                UserConsent.revoked_at.is_(None)
+            )
+            .values(revoked_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+        if result.rowcount:
+            await self._withdraw([user_id], consent_type)
+            await self.db.commit()
+
+    async def has_consent(self, user_id: int, consent_type: str) -> bool:
+        return await self.db.scalar(select(CurrentConsent.user_id).where(
+            CurrentConsent.consent_type == consent_type,
+            CurrentConsent.user_id == user_id
+        )) is not None
+
+    async def consenting_users(self, user_ids: Iterable[int], consent_type: str) -> Set[int]:
+        """The subset of user_ids that currently consent to consent_type"""
+        wanted = set(user_ids)
+        if not wanted:
+            return set()
+        if len(wanted) > CONSENT_SCAN_THRESHOLD:
+            # One pass over the type's slice of the primary key
+            result = await self.db.stream_scalars(
+                select(CurrentConsent.user_id)
+                .where(CurrentConsent.consent_type == consent_type)
+                .execution_options(yield_per=10000)
+            )
+            return {user_id async for user_id in result if user_id in wanted}
+
+        ids = sorted(wanted)
+        members: Set[int] = set()
+        for start in range(0, len(ids), CONSENT_CHUNK):
+            members.update((await self.db.scalars(
+                select(CurrentConsent.user_id).where(
+                    CurrentConsent.consent_type == consent_type,
+                    CurrentConsent.user_id.in_(ids[start:start + CONSENT_CHUNK])
+                )
+            )).all())
+        return members
+
+    async def import_consents(self, records: Iterable[Tuple[int, str, bool, Optional[datetime]]],
+                              ip_address: Optional[str] = None,
+                              user_agent: Optional[str] = None) -> int:
+        """Bulk-load (user_id, consent_type, granted, granted_at) records
+
+        Appends history with multi-row inserts and rewrites the current
+        state for the affected users in a few statements per chunk. Later
+        records for the same user and type win. Returns the record count.
+        """
+        records = list(records)
+        now = datetime.utcnow()
+        for start in range(0, len(records), CONSENT_CHUNK):
+            chunk = records[start:start + CONSENT_CHUNK]
+            await self.db.execute(insert(UserConsent), [
+                {
+                    "user_id": user_id,
+                    "consent_type": consent_type,
+                    "granted": granted,
+                    "granted_at": (granted_at or now) if granted else None,
+                    "ip_address": ip_address,
+                    "user_agent": user_agent
+                }
+                for user_id, consent_type, granted, granted_at in chunk
+            ])
+
+            latest = {}
+            for user_id, consent_type, granted, granted_at in chunk:
+                latest[(consent_type, user_id)] = (granted, granted_at or now)
+            by_type = {}
+            for consent_type, user_id in latest:
+                by_type.setdefault(consent_type, []).append(user_id)
+            for consent_type, user_ids in by_type.items():
+                await self._withdraw(user_ids, consent_type)
+            granted_rows = [
+                {"consent_type": consent_type, "user_id": user_id, "granted_at": granted_at}
+                for (consent_type, user_id), (granted, granted_at) in latest.items() if granted
+            ]
+            if granted_rows:
+                await self.db.execute(insert(CurrentConsent), granted_rows)
+        await self.db.commit()
+        return len(records)
+
+    async def rebuild_current_consents(self):
+        """Recompute current_consents from the full history"""
+        latest = (
+            select(func.max(UserConsent.id))
+            .group_by(UserConsent.user_id, UserConsent.consent_type)
+        )
+        await self.db.execute(delete(CurrentConsent))
+        await self.db.execute(insert(CurrentConsent).from_select(
+            ["consent_type", "user_id", "granted_at"],
+            select(UserConsent.consent_type, UserConsent.user_id, UserConsent.granted_at)
+            .where(
+                UserConsent.id.in_(latest),
+                UserConsent.granted.is_(True),
+                UserConsent.revoked_at.is_(None)
+            )
+        ))
+        await self.db.commit()
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Text, Float, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -16,11 +16,34 @@ class Course(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     instructor_id = Column(Integer, ForeignKey('users.id'))
+    is_premium = Column(Boolean, nullable=False, default=False)
+    has_certificate = Column(Boolean, nullable=False, default=False)
+    enrolled_count = Column(Integer, nullable=False, default=0)
+    average_rating = Column(Float)  # NULL until the course is first rated
+    # Rollups over the syllabus, maintained by app.services.syllabus
+    total_duration = Column(Integer, nullable=False, default=0)  # in minutes
+    lesson_count = Column(Integer, nullable=False, default=0)
+    # Bumped on every syllabus change; keys the cached syllabus
+    version = Column(Integer, nullable=False, default=1)
 
     # Relationships
     instructor = relationship("User", back_populates="courses")
-    modules = relationship("Module", back_populates="course")
+    modules = relationship("Module", back_populates="course", order_by="Module.order")
     enrollments = relationship("Enrollment", back_populates="course")
+    progress = relationship("CourseProgress", back_populates="course")
+
+class Enrollment(Base):
+    __tablename__ = 'enrollments'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'course_id', name='uq_enrollment_user_course'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    course_id = Column(Integer, ForeignKey('courses.id'), nullable=False, index=True)
+    enrolled_at = Column(DateTime, default=datetime.utcnow)
+
+    course = relationship("Course", back_populates="enrollments")
 
 class Module(Base):
     __tablename__ = 'modules'
@@ -29,10 +52,12 @@ class Module(Base):
     title = Column(String(200), nullable=False)
     description = Column(Text)
     order = Column(Integer, nullable=False)
-    course_id = Column(Integer, ForeignKey('courses.id'))
+    course_id = Column(Integer, ForeignKey('courses.id'), index=True)
+    total_duration = Column(Integer, nullable=False, default=0)  # in minutes
+    lesson_count = Column(Integer, nullable=False, default=0)
 
     course = relationship("Course", back_populates="modules")
-    lessons = relationship("Lesson", back_populates="module")
+    lessons = relationship("Lesson", back_populates="module", order_by="Lesson.order")
 
 class Lesson(Base):
     __tablename__ = 'lessons'
@@ -43,6 +68,6 @@ class Lesson(Base):
     type = Column(String(50))  # video, article, quiz, etc.
     duration = Column(Integer)  # in minutes
     order = Column(Integer, nullable=False)
-    module_id = Column(Integer, ForeignKey('modules.id'))
+    module_id = Column(Integer, ForeignKey('modules.id'), index=True)
 
     module = relationship("Module", back_populates="lessons")
\ No newline at end of file
@@ -1,8 +1,11 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Table, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
+# Event.datetime shadows the datetime class inside the Event class body
+_utcnow = datetime.utcnow
+
 event_attendees = Table('event_attendees', Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
     Column('event_id', Integer, ForeignKey('events.id'))
@@ -14,20 +17,24 @@ class Event(Base):
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
     description = Column(Text)
-    datetime = Column(DateTime, nullable=False)
+    datetime = Column(DateTime, nullable=False, index=True)
     duration = Column(Integer)  # in minutes
     image_url = Column(String(500))
     max_attendees = Column(Integer)
     current_attendees = Column(Integer, default=0)
     speaker_id = Column(Integer, ForeignKey('users.id'))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=_utcnow)
+    updated_at = Column(DateTime, default=_utcnow, onupdate=_utcnow)
 
     speaker = relationship("User", foreign_keys=[speaker_id])
     attendees = relationship("User", secondary=event_attendees, back_populates="events")
+    registrations = relationship("EventRegistration", back_populates="event")
     
 class EventRegistration(Base):
     __tablename__ = 'event_registrations'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'event_id', name='uq_event_registration_user_event'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -37,4 +44,16 @@ class EventRegistration(Base):
     feedback_submitted = Column(Boolean, default=False)
 
     user = relationship("User", back_populates="event_registrations")
-    event = relationship("Event", back_populates="registrations")
\ No newline at end of file
+    event = relationship("Event", back_populates="registrations")
+
+class EventWaitlistEntry(Base):
+    __tablename__ = 'event_waitlist'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'event_id', name='uq_event_waitlist_user_event'),
+    )
+
+    # Autoincrement id doubles as the FIFO position within an event
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    event_id = Column(Integer, ForeignKey('events.id'), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
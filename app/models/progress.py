@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -15,4 +15,42 @@ class CourseProgress(Base):
     completed_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="course_progress")
-    course = relationship("Course", back_populates="progress")
\ No newline at end of file
+    course = relationship("Course", back_populates="progress")
+
+class CourseCompletion(Base):
+    __tablename__ = 'course_completions'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'course_id', name='uq_course_completion_user_course'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    course_id = Column(Integer, ForeignKey('courses.id'), nullable=False)
+    completed_at = Column(DateTime, default=datetime.utcnow)
+
+class Certificate(Base):
+    __tablename__ = 'certificates'
+    __table_args__ = (
+        UniqueConstraint('user_id', 'course_id', name='uq_certificate_user_course'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    course_id = Column(Integer, ForeignKey('courses.id'), nullable=False)
+    issued_at = Column(DateTime, default=datetime.utcnow)
+
+# Per-user rollup of course_progress, kept current by applying deltas
+class UserProgressSummary(Base):
+    __tablename__ = 'user_progress_summaries'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    course_count = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Float, nullable=False, default=0.0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def overall_progress(self) -> float:
+        if not self.course_count:
+            return 0
+        return round(self.progress_total / self.course_count, 2)
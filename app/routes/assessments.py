@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from app.async_database import get_async_db
+from app.auth.dependencies import get_current_user
+from app.models.assessment import Assessment, AssessmentAttempt
+from app.models.course import Course
+from app.schemas.assessment import AttemptSubmission
+from app.security.permissions import is_admin
+from app.services.grading import (
+    assessment_item_statistics,
+    encode_answers,
+    get_answer_key,
+    grade_attempts,
+    score_codes
+)
+
+router = APIRouter()
+
+async def _require_course_staff(db: AsyncSession, assessment_id: int, user):
+    """Grading and item statistics (which reveal the answer key) are for the
+    course instructor and administrators only"""
+    found = (await db.execute(
+        select(Assessment.id, Course.instructor_id)
+        .outerjoin(Course, Course.id == Assessment.course_id)
+        .where(Assessment.id == assessment_id)
+    )).first()
+    if found is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found"
+        )
+    if found.instructor_id != user.id and not is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the course instructor can do this"
+        )
+
+@router.post("/assessments/{assessment_id}/attempts/{attempt_id}/submit")
+async def submit_attempt(
+    assessment_id: int,
+    attempt_id: int,
+    submission: AttemptSubmission,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    attempt = await db.scalar(select(AssessmentAttempt).where(
+        AssessmentAttempt.id == attempt_id,
+        AssessmentAttempt.assessment_id == assessment_id,
+        AssessmentAttempt.user_id == current_user.id
+    ))
+    if not attempt:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attempt not found"
+        )
+    if attempt.completed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Attempt already submitted"
+        )
+
+    key = await get_answer_key(db, assessment_id)
+    scores, passed = score_codes(key, encode_answers(key, [submission.answers]))
+    attempt.answers = submission.answers
+    attempt.score = float(scores[0])
+    attempt.completed = True
+    attempt.end_time = datetime.utcnow()
+    await db.commit()
+    return {"score": attempt.score, "passed": bool(passed[0])}
+
+@router.post("/assessments/{assessment_id}/grade")
+async def grade_assessment(
+    assessment_id: int,
+    regrade: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    await _require_course_staff(db, assessment_id, current_user)
+    graded = await grade_attempts(db, assessment_id, regrade=regrade)
+    if graded < 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found"
+        )
+    return {"graded": graded}
+
+@router.get("/assessments/{assessment_id}/item-statistics")
+async def get_item_statistics(
+    assessment_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    await _require_course_staff(db, assessment_id, current_user)
+    stats = await assessment_item_statistics(db, assessment_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assessment not found"
+        )
+    return stats
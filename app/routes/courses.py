@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
-from app.database import get_db
-from app.models.course import Course, CourseEnrollment, CourseProgress
+from datetime import datetime, timedelta, timezone
+from app.async_database import get_async_db
+from app.models.course import Course, Enrollment
+from app.models.progress import Certificate, CourseCompletion, CourseProgress
 from app.schemas.course import (
     CourseCreate,
     CourseResponse,
@@ -11,89 +13,165 @@ from app.schemas.course import (
     EnrollmentCreate,
     ProgressUpdate
 )
+from app.schemas.progress import ProgressBatch
 from app.auth.dependencies import get_current_user
+from app.services.catalog_cache import catalog_cache, snapshot_course
+from app.services.job_queue import enqueue, job_handler
+from app.services.progress_rollup import apply_progress_delta, get_progress_summary
+from app.services.search_index import SORTED_SEARCH_LIMIT, course_index
+from app.services.syllabus import get_syllabus_json
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_offset,
+    encode_cursor,
+    keyset_page,
+    stream_ndjson
+)
 
 router = APIRouter()
 
+# sort_by -> (keyset column, descending)
+COURSE_SORTS = {
+    "popular": (Course.enrolled_count, True),
+    "newest": (Course.created_at, True),
+    "rating": (Course.average_rating, True),
+}
+DEFAULT_COURSE_SORT = (Course.created_at, False)
+# Client clocks drift and offline batches arrive late; event times are
+# clamped to this window before now
+MAX_PROGRESS_EVENT_AGE = timedelta(days=7)
+
+COURSE_COMPLETION_JOB = "course_completion"
+CERTIFICATE_JOB = "issue_certificate"
+
 @router.get("/courses", response_model=List[CourseResponse])
 async def list_courses(
-    skip: int = 0,
-    limit: int = 10,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
     category: Optional[str] = None,
     level: Optional[str] = None,
     search: Optional[str] = None,
     sort_by: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(Course)
-
-    # Apply filters
-    if category:
-        query = query.filter(Course.category == category)
-    if level:
-        query = query.filter(Course.level == level)
-    if search:
-        query = query.filter(
-            Course.title.ilike(f"%{search}%") |
-            Course.description.ilike(f"%{search}%")
+    if sort_by not in (None, "relevance") and sort_by not in COURSE_SORTS:
+        raise HTTPException(status_code=400, detail="Unknown sort_by")
+    cache_key = (category, level, search, sort_by, cursor, limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is None:
+        query = select(Course)
+
+        # Apply filters
+        if category:
+            query = query.where(Course.category == category)
+        if level:
+            query = query.where(Course.level == level)
+        ranks = None
+        if search:
+            ranked = course_index.search(search, {"category": category, "level": level})
+            ranks = {doc_id: position for position, (doc_id, _) in enumerate(ranked)}
+
+        if ranks is not None and sort_by in (None, "relevance"):
+            # Ranked ids live in memory, so the cursor is just a position in them
+            start = decode_offset(cursor)
+            page_ids = list(ranks)[start:start + limit]
+            rows = (await db.scalars(query.where(Course.id.in_(page_ids)))).all()
+            rows.sort(key=lambda c: ranks[c.id])
+            next_cursor = encode_cursor(start + limit) if start + limit < len(ranks) else None
+        else:
+            sort_column, descending = COURSE_SORTS.get(sort_by, DEFAULT_COURSE_SORT)
+            if ranks is not None:
+                query = query.where(Course.id.in_(list(ranks)[:SORTED_SEARCH_LIMIT]))
+            rows, next_cursor = await keyset_page(
+                db, query, sort_column, Course.id, cursor, limit, descending=descending
+            )
+        cached = ([snapshot_course(c) for c in rows], next_cursor)
+        catalog_cache.set(cache_key, cached)
+
+    courses, next_cursor = cached
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    # Get user progress for enrolled courses in a single query
+    course_ids = [c["id"] for c in courses]
+    progress_by_course = {}
+    if course_ids:
+        result = await db.execute(
+            select(CourseProgress.course_id, CourseProgress.progress_percentage).where(
+                CourseProgress.course_id.in_(course_ids),
+                CourseProgress.user_id == current_user.id
+            )
         )
+        progress_by_course = dict(result.all())
 
-    # Apply sorting
-    if sort_by == "popular":
-        query = query.order_by(Course.enrolled_count.desc())
-    elif sort_by == "newest":
-        query = query.order_by(Course.created_at.desc())
-    elif sort_by == "rating":
-        query = query.order_by(Course.average_rating.desc())
-
-    # Get user progress for enrolled courses
-    courses = query.offset(skip).limit(limit).all()
-    for course in courses:
-        progress = db.query(CourseProgress).filter(
-            CourseProgress.course_id == course.id,
-            CourseProgress.user_id == current_user.id
-        ).first()
-        if progress:
-            course.user_progress = progress.progress_percentage
+    return [
+        {**course, "user_progress": progress_by_course.get(course["id"])}
+        for course in courses
+    ]
 
-    return courses
+@router.get("/courses/{course_id}/syllabus")
+async def get_course_syllabus(
+    course_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    found = await get_syllabus_json(db, course_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    version, body = found
+    etag = f'"syllabus-{course_id}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.post("/courses/filter")
 async def filter_courses(
     filters: CourseFilter,
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(Course)
+    query = select(Course)
 
     if filters.categories:
-        query = query.filter(Course.category.in_(filters.categories))
+        query = query.where(Course.category.in_(filters.categories))
     if filters.level:
-        query = query.filter(Course.level == filters.level)
+        query = query.where(Course.level == filters.level)
     if filters.duration:
         # Implement duration filtering logic based on your duration format
         pass
 
-    return query.all()
+    if stream:
+        return stream_ndjson(query.order_by(Course.created_at, Course.id))
+
+    courses, next_cursor = await keyset_page(db, query, Course.created_at, Course.id, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return courses
 
 @router.post("/courses/enroll")
 async def enroll_in_course(
     enrollment: EnrollmentCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     # Check if already enrolled
-    existing_enrollment = db.query(CourseEnrollment).filter(
-        CourseEnrollment.course_id == enrollment.course_id,
-        CourseEnrollment.user_id == current_user.id
-    ).first()
+    existing_enrollment = await db.scalar(select(Enrollment).where(
+        Enrollment.course_id == enrollment.course_id,
+        Enrollment.user_id == current_user.id
+    ))
 
     if existing_enrollment:
         raise HTTPException(status_code=400, detail="Already enrolled in this course")
 
     # Check if course exists and is available
-    course = db.query(Course).filter(Course.id == enrollment.course_id).first()
+    course = await db.get(Course, enrollment.course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     
@@ -101,7 +179,7 @@ async def enroll_in_course(
         raise HTTPException(status_code=403, detail="Premium subscription required")
 
     # Create enrollment
-    new_enrollment = CourseEnrollment(
+    new_enrollment = Enrollment(
         course_id=enrollment.course_id,
         user_id=current_user.id,
         enrolled_at=datetime.utcnow()
@@ -119,25 +197,30 @@ async def enroll_in_course(
 
     # Update course enrollment count
     course.enrolled_count += 1
+    await apply_progress_delta(db, current_user.id, courses=1)
 
-    db.commit()
+    await db.commit()
     return {"success": True}
 
 @router.get("/users/{user_id}/progress")
 async def get_user_progress(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to view this progress")
 
-    progress = db.query(CourseProgress).filter(
-        CourseProgress.user_id == user_id
-    ).all()
+    summary = await get_progress_summary(db, user_id)
+    progress = (await db.execute(select(
+        CourseProgress.course_id,
+        CourseProgress.progress_percentage,
+        CourseProgress.last_accessed
+    ).where(CourseProgress.user_id == user_id))).all()
 
     return {
-        "overallProgress": calculate_overall_progress(progress),
+        "overallProgress": summary.overall_progress,
+        "completedCourses": summary.completed_count,
         "courses": [
             {
                 "id": p.course_id,
@@ -147,55 +230,144 @@ async def get_user_progress(
         ]
     }
 
+# Set a course's progress; returns (progress delta, newly completed)
+def apply_progress(progress, percentage, accessed_at):
+    delta = percentage - (progress.progress_percentage or 0)
+    progress.progress_percentage = percentage
+    progress.last_accessed = accessed_at
+    newly_completed = percentage == 100 and not progress.completed
+    if newly_completed:
+        progress.completed = True
+        progress.completed_at = accessed_at
+    return delta, newly_completed
+
 @router.put("/courses/{course_id}/progress")
 async def update_course_progress(
     course_id: int,
     progress_update: ProgressUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    progress = db.query(CourseProgress).filter(
+    # Lock the row so concurrent updates can't both diff against the same
+    # old percentage and double-count the rollup delta
+    progress = await db.scalar(select(CourseProgress).where(
         CourseProgress.course_id == course_id,
         CourseProgress.user_id == current_user.id
-    ).first()
+    ).with_for_update())
 
     if not progress:
         raise HTTPException(status_code=404, detail="Course progress not found")
 
-    progress.progress_percentage = progress_update.progress_percentage
-    progress.last_accessed = datetime.utcnow()
+    delta, newly_completed = apply_progress(
+        progress, progress_update.progress_percentage, datetime.utcnow()
+    )
+    await apply_progress_delta(db, current_user.id, progress=delta, completed=int(newly_completed))
 
-    if progress.progress_percentage == 100:
+    if newly_completed:
         # Handle course completion
-        handle_course_completion(db, current_user.id, course_id)
+        await handle_course_completion(db, current_user.id, course_id)
 
-    db.commit()
+    await db.commit()
     return {"success": True}
 
-def calculate_overall_progress(progress_records):
-    if not progress_records:
-        return 0
-    total_progress = sum(p.progress_percentage for p in progress_records)
-    return round(total_progress / len(progress_records), 2)
+def _event_time(occurred_at: Optional[datetime], now: datetime) -> datetime:
+    """Naive UTC, as stored, clamped to [now - MAX_PROGRESS_EVENT_AGE, now]"""
+    if occurred_at is None:
+        return now
+    if occurred_at.tzinfo is not None:
+        occurred_at = occurred_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(max(occurred_at, now - MAX_PROGRESS_EVENT_AGE), now)
 
-def handle_course_completion(db, user_id, course_id):
-    # Add completion record
-    completion = CourseCompletion(
-        user_id=user_id,
-        course_id=course_id,
-        completed_at=datetime.utcnow()
+@router.post("/courses/progress/batch")
+async def update_course_progress_batch(
+    batch: ProgressBatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    # Coalesce to the latest event per course; events without a timestamp
+    # count as happening in the order they were sent
+    now = datetime.utcnow()
+    latest = {}
+    for position, event in enumerate(batch.events):
+        key = (_event_time(event.occurred_at, now), position)
+        if event.course_id not in latest or key >= latest[event.course_id][0]:
+            latest[event.course_id] = (key, event)
+
+    # Locked in course order so overlapping batches can't deadlock
+    rows = (await db.scalars(select(CourseProgress).where(
+        CourseProgress.user_id == current_user.id,
+        CourseProgress.course_id.in_(latest)
+    ).order_by(CourseProgress.course_id).with_for_update())).all()
+
+    total_delta, completed, stale = 0.0, [], []
+    for progress in rows:
+        (accessed_at, _), event = latest[progress.course_id]
+        # A replayed offline event must not roll back newer progress
+        if progress.last_accessed and accessed_at < progress.last_accessed:
+            stale.append(progress.course_id)
+            continue
+        delta, newly_completed = apply_progress(progress, event.progress_percentage, accessed_at)
+        total_delta += delta
+        if newly_completed:
+            completed.append(progress.course_id)
+
+    await apply_progress_delta(db, current_user.id, progress=total_delta, completed=len(completed))
+    for course_id in completed:
+        await handle_course_completion(db, current_user.id, course_id)
+
+    await db.commit()
+    found = {p.course_id for p in rows}
+    updated = found - set(stale)
+    return {
+        "success": True,
+        "events": len(batch.events),
+        "updatedCourses": sorted(updated),
+        "staleCourses": sorted(stale),
+        "unknownCourses": sorted(set(latest) - found),
+        "completedCourses": completed
+    }
+
+async def handle_course_completion(db, user_id, course_id):
+    # Completion side effects run on the job workers once this commits
+    await enqueue(
+        db,
+        COURSE_COMPLETION_JOB,
+        {"user_id": user_id, "course_id": course_id},
+        idempotency_key=f"{COURSE_COMPLETION_JOB}:{user_id}:{course_id}"
     )
-    db.add(completion)
+
+@job_handler(COURSE_COMPLETION_JOB)
+async def record_course_completion(db, payload):
+    user_id, course_id = payload["user_id"], payload["course_id"]
+
+    # Add completion record
+    existing = await db.scalar(select(CourseCompletion.id).where(
+        CourseCompletion.user_id == user_id,
+        CourseCompletion.course_id == course_id
+    ))
+    if existing is None:
+        db.add(CourseCompletion(
+            user_id=user_id,
+            course_id=course_id,
+            completed_at=datetime.utcnow()
+        ))
 
     # Issue certificate if available
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if course.has_certificate:
-        certificate = Certificate(
+    course = await db.get(Course, course_id)
+    if course is not None and course.has_certificate:
+        await enqueue(db, CERTIFICATE_JOB, payload,
+                      idempotency_key=f"{CERTIFICATE_JOB}:{user_id}:{course_id}")
+
+@job_handler(CERTIFICATE_JOB)
+async def issue_certificate(db, payload):
+    user_id, course_id = payload["user_id"], payload["course_id"]
+    existing = await db.scalar(select(Certificate.id).where(
+        Certificate.user_id == user_id,
+        Certificate.course_id == course_id
+    ))
+    if existing is None:
+        db.add(Certificate(
             user_id=user_id,
             course_id=course_id,
             issued_at=datetime.utcnow()
-        )
-        db.add(certificate)
-
-    # Update user achievements
-    update_user_achievements(db, user_id, course_id)
\ No newline at end of file
+        ))
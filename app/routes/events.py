@@ -1,75 +1,126 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.models.event import Event, EventRegistration
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.async_database import AsyncSessionLocal, get_async_db
+from app.models.event import Event
 from app.schemas.event import EventCreate, EventUpdate, EventResponse
 from app.auth.dependencies import get_current_user
-from datetime import datetime
+from app.services import event_registration
+from app.services.cache_sync import cache_sync
+from app.services.event_calendar import events_between, ical_feed
+from app.services.event_reminders import reminder_scheduler
+from app.utils.pagination import NEXT_CURSOR_HEADER, keyset_page, stream_ndjson
+from datetime import datetime, timedelta, timezone
+
+MAX_CALENDAR_SPAN = timedelta(days=366)
 
 router = APIRouter()
 
+@router.on_event("startup")
+async def start_reminder_scheduler():
+    # Subscribe before loading so no event committed meanwhile is missed
+    await cache_sync.start()
+    async with AsyncSessionLocal() as db:
+        await reminder_scheduler.load(db)
+    reminder_scheduler.start()
+
+@router.on_event("shutdown")
+async def stop_reminder_scheduler():
+    await reminder_scheduler.stop()
+
 @router.get("/events", response_model=List[EventResponse])
 async def list_events(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     current_time = datetime.utcnow()
-    events = db.query(Event)\
-        .filter(Event.datetime > current_time)\
-        .order_by(Event.datetime)\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    query = select(Event).where(Event.datetime > current_time)
+    if stream:
+        return stream_ndjson(query.order_by(Event.datetime, Event.id))
+
+    events, next_cursor = await keyset_page(db, query, Event.datetime, Event.id, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return events
 
 @router.post("/events/register")
 async def register_for_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    event = db.query(Event).filter(Event.id == event_id).first()
-    if not event:
+    try:
+        result = await event_registration.register(db, event_id, current_user.id)
+    except event_registration.EventNotFound:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    
-    if event.current_attendees >= event.max_attendees:
+    except event_registration.AlreadyRegistered:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Event is full"
+            detail="Already registered for this event"
         )
 
-    existing_registration = db.query(EventRegistration)\
-        .filter(
-            EventRegistration.user_id == current_user.id,
-            EventRegistration.event_id == event_id
-        ).first()
+    if not result.registered:
+        return {
+            "message": "Event is full, you have been added to the waitlist",
+            "waitlisted": True,
+            "waitlistPosition": result.waitlist_position
+        }
+    return {"message": "Successfully registered for the event", "waitlisted": False}
+
+@router.delete("/events/{event_id}/registration")
+async def cancel_event_registration(
+    event_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    if not await event_registration.cancel(db, event_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not registered for this event"
+        )
+    return {"message": "Registration cancelled"}
 
-    if existing_registration:
+@router.get("/events/calendar")
+async def get_event_calendar(
+    start: datetime,
+    end: datetime,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Stored times are naive UTC
+    start, end = [
+        moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+        for moment in (start, end)
+    ]
+    if end <= start or end - start > MAX_CALENDAR_SPAN:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already registered for this event"
+            detail="end must be after start and within a year of it"
         )
+    return await events_between(db, start, end)
 
-    registration = EventRegistration(
-        user_id=current_user.id,
-        event_id=event_id
+@router.get("/events/calendar.ics")
+async def get_my_calendar_feed(current_user = Depends(get_current_user)):
+    return StreamingResponse(
+        ical_feed(current_user.id),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="events.ics"'}
     )
-    
-    event.current_attendees += 1
-    
-    db.add(registration)
-    db.commit()
-    
-    return {"message": "Successfully registered for the event"}
+
+@router.get("/events/reminders/stats")
+async def get_reminder_stats(current_user = Depends(get_current_user)):
+    return reminder_scheduler.stats()
 
 @router.get("/events/{event_id}", response_model=EventResponse)
-async def get_event(event_id: int, db: Session = Depends(get_db)):
-    event = db.query(Event).filter(Event.id == event_id).first()
+async def get_event(event_id: int, db: AsyncSession = Depends(get_async_db)):
+    event = await db.get(Event, event_id)
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,134 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.async_database import AsyncSessionLocal, get_async_db
+from app.auth.dependencies import get_current_user
+from app.models.community import ForumTopic, TopicReply
+from app.schemas.forum import ReplyCreate, TopicCreate
+from app.services import forum
+from app.services.cache_sync import cache_sync
+from app.utils.pagination import NEXT_CURSOR_HEADER, keyset_page, row_to_dict
+
+router = APIRouter()
+
+@router.on_event("startup")
+async def load_hot_topics():
+    # Subscribe before loading so no change committed meanwhile is missed
+    await cache_sync.start()
+    async with AsyncSessionLocal() as db:
+        await forum.backfill_topic_activity(db)
+        await forum.rebuild_hot_topics(db)
+
+@router.get("/forum/topics")
+async def list_topics(
+    response: Response,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Most recently active first, along ix_forum_topics_category_last_reply
+    query = select(ForumTopic)
+    if category:
+        query = query.where(ForumTopic.category == category)
+    topics, next_cursor = await keyset_page(
+        db, query, ForumTopic.last_reply_at, ForumTopic.id, cursor, limit, descending=True
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [row_to_dict(topic) for topic in topics]
+
+@router.get("/forum/topics/hot")
+async def list_hot_topics(
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    ranked = forum.hot_topics.top(limit, category)
+    if not ranked:
+        return []
+    topics = {
+        topic.id: topic
+        for topic in (await db.scalars(
+            select(ForumTopic).where(ForumTopic.id.in_([topic_id for topic_id, _ in ranked]))
+        )).all()
+    }
+    return [
+        {**row_to_dict(topics[topic_id]), "hotScore": round(score, 3)}
+        for topic_id, score in ranked if topic_id in topics
+    ]
+
+@router.post("/forum/topics", status_code=status.HTTP_201_CREATED)
+async def create_topic(
+    topic: TopicCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    new_topic = ForumTopic(
+        title=topic.title,
+        content=topic.content,
+        category=topic.category,
+        author_id=current_user.id
+    )
+    db.add(new_topic)
+    await db.commit()
+    return row_to_dict(new_topic)
+
+@router.get("/forum/topics/{topic_id}")
+async def get_topic(topic_id: int, db: AsyncSession = Depends(get_async_db)):
+    topic = await db.get(ForumTopic, topic_id)
+    if not topic:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Topic not found"
+        )
+    return row_to_dict(topic)
+
+@router.get("/forum/topics/{topic_id}/replies")
+async def list_replies(
+    topic_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Oldest first, along ix_topic_replies_topic_created
+    replies, next_cursor = await keyset_page(
+        db, select(TopicReply).where(TopicReply.topic_id == topic_id),
+        TopicReply.created_at, TopicReply.id, cursor, limit
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [row_to_dict(reply) for reply in replies]
+
+@router.post("/forum/topics/{topic_id}/replies", status_code=status.HTTP_201_CREATED)
+async def create_reply(
+    topic_id: int,
+    reply: ReplyCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    try:
+        new_reply = await forum.add_reply(db, topic_id, current_user.id, reply.content)
+    except forum.TopicNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Topic not found"
+        )
+    return row_to_dict(new_reply)
+
+@router.delete("/forum/replies/{reply_id}")
+async def delete_reply(
+    reply_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    reply = await db.get(TopicReply, reply_id)
+    if not reply or reply.author_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Reply not found"
+        )
+    await forum.delete_reply(db, reply)
+    return {"message": "Reply deleted"}
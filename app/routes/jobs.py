@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import get_async_db
+from app.models.job import KeyRotation
+from app.security.permissions import require_admin
+from app.services import key_rotation
+from app.services.job_queue import job_pool
+from app.services.mailer import smtp_pool
+
+router = APIRouter()
+
+@router.on_event("startup")
+async def start_job_workers():
+    job_pool.start()
+
+@router.on_event("shutdown")
+async def stop_job_workers():
+    await job_pool.stop()
+    smtp_pool.close()
+
+@router.get("/jobs/stats")
+async def get_job_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    stats = await job_pool.stats(db)
+    stats["smtp"] = smtp_pool.stats()
+    return stats
+
+@router.post("/jobs/key-rotations", status_code=status.HTTP_202_ACCEPTED)
+async def start_key_rotation(
+    column: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    try:
+        rotation = await key_rotation.start_rotation(db, column)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Column is not registered for encryption"
+        )
+    return key_rotation.rotation_status(rotation)
+
+@router.get("/jobs/key-rotations/{rotation_id}")
+async def get_key_rotation(
+    rotation_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    rotation = await db.get(KeyRotation, rotation_id)
+    if not rotation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Key rotation not found"
+        )
+    return key_rotation.rotation_status(rotation)
+
+@router.post("/jobs/key-rotations/{rotation_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_key_rotation(
+    rotation_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    rotation = await key_rotation.resume_rotation(db, rotation_id)
+    if not rotation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Key rotation not found"
+        )
+    return key_rotation.rotation_status(rotation)
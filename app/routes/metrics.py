@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Response
+from app.async_database import async_engine
+from app.routes.websocket import manager
+from app.services.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    instrument_engine,
+    pool_stats,
+    registry
+)
+
+# Per-route latency and per-request SQL counts also need the middleware:
+# app.add_middleware(MetricsMiddleware)
+router = APIRouter()
+
+instrument_engine(async_engine)
+
+registry.gauge(
+    "db_pool_connections", "Database pool connections by state",
+    lambda: pool_stats(async_engine), labels=("state",)
+)
+registry.gauge(
+    "websocket_connections", "Open websocket connections on this worker",
+    lambda: manager.connection_count
+)
+registry.gauge(
+    "websocket_send_queue_depth", "Messages queued for websocket clients on this worker",
+    manager.queue_depth
+)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
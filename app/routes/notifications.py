@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.async_database import get_async_db
+from app.auth.dependencies import get_current_user
+from app.schemas.notification import MarkReadRequest
+from app.services.notification_service import NotificationService
+from app.utils.pagination import NEXT_CURSOR_HEADER
+
+router = APIRouter()
+
+@router.get("/notifications")
+async def list_notifications(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    unread_only: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    notifications, next_cursor = await NotificationService(db).list_inbox(
+        current_user.id, cursor, limit, unread_only
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        {
+            "id": n.id,
+            "type": n.type.value,
+            "title": n.title,
+            "message": n.message,
+            "read": n.read,
+            "createdAt": n.created_at
+        }
+        for n in notifications
+    ]
+
+@router.get("/notifications/unread-count")
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    return {"unread": await NotificationService(db).unread_count(current_user.id)}
+
+@router.post("/notifications/read")
+async def mark_notifications_read(
+    request: MarkReadRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    service = NotificationService(db)
+    updated = await service.mark_read(current_user.id, request.ids)
+    return {"updated": updated, "unread": await service.unread_count(current_user.id)}
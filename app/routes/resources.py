@@ -1,200 +1,292 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime
-from app.database import get_db
+from app.async_database import AsyncSessionLocal, get_async_db
 from app.models.resource import (
     Resource,
-    ResourceDownload,
-    ResourceView,
     HealthcareFacility,
     EmergencyContact
 )
 from app.schemas.resource import (
     ResourceResponse,
     ResourceCreate,
-    FacilityResponse,
     EmergencyContactResponse,
     ResourceDownloadCreate,
     ResourceViewCreate
 )
+from app.schemas.facility import FacilityDistanceResponse
 from app.auth.dependencies import get_current_user
+from app.security.permissions import require_admin
+from app.services.cache_sync import cache_sync
+from app.services.recommender import (
+    DOWNLOAD_WEIGHT,
+    VIEW_WEIGHT,
+    rebuild_recommendations,
+    recommender,
+    start_periodic_rebuild,
+    stop_periodic_rebuild
+)
+from app.services.search_index import SORTED_SEARCH_LIMIT, resource_index, rebuild_search_indexes
+from app.services.spatial_index import facility_index, rebuild_facility_index
+from app.services.write_behind import activity_buffer
+from app.utils.file_delivery import file_response
+from app.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_offset,
+    encode_cursor,
+    keyset_page,
+    row_to_dict,
+    stream_ndjson
+)
 
 router = APIRouter()
 
-@router.get("/resources/facilities", response_model=List[FacilityResponse])
+@router.on_event("startup")
+async def load_indexes():
+    # Subscribe before loading so no change committed meanwhile is missed
+    await cache_sync.start()
+    async with AsyncSessionLocal() as db:
+        await rebuild_search_indexes(db)
+        await rebuild_facility_index(db)
+        await rebuild_recommendations(db)
+
+@router.on_event("startup")
+async def start_background_jobs():
+    activity_buffer.start()
+    start_periodic_rebuild(AsyncSessionLocal)
+
+@router.on_event("shutdown")
+async def flush_activity_buffer():
+    await stop_periodic_rebuild()
+    await activity_buffer.stop()
+    await cache_sync.stop()
+
+@router.get("/resources/activity-buffer")
+async def get_activity_buffer_stats(current_user = Depends(require_admin)):
+    return activity_buffer.stats()
+
+async def _facilities_by_distance(db: AsyncSession, ranked):
+    """Load facilities for (id, distance_km) pairs, keeping their order"""
+    if not ranked:
+        return []
+    distances = dict(ranked)
+    rows = (await db.scalars(
+        select(HealthcareFacility).where(HealthcareFacility.id.in_(distances))
+    )).all()
+    facilities = [{**row_to_dict(f), "distance_km": round(distances[f.id], 3)} for f in rows]
+    facilities.sort(key=lambda f: (f["distance_km"], f["id"]))
+    return facilities
+
+@router.get("/resources/facilities", response_model=List[FacilityDistanceResponse])
 async def list_facilities(
-    latitude: float = Query(None),
-    longitude: float = Query(None),
-    radius: float = Query(10.0),  # Default 10km radius
-    db: Session = Depends(get_db),
+    response: Response,
+    latitude: float = Query(None, ge=-90, le=90),
+    longitude: float = Query(None, ge=-180, le=180),
+    radius: float = Query(10.0, gt=0, le=500),  # Default 10km radius
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    query = db.query(HealthcareFacility)
-    
-    if latitude and longitude:
-        # Calculate facilities within radius using PostGIS
-        query = query.filter(
-            func.ST_DWithin(
-                func.ST_SetSRID(
-                    func.ST_MakePoint(HealthcareFacility.longitude, HealthcareFacility.latitude),
-                    4326
-                ),
-                func.ST_SetSRID(
-                    func.ST_MakePoint(longitude, latitude),
-                    4326
-                ),
-                radius * 1000  # Convert km to meters
-            )
+    if latitude is None or longitude is None:
+        facilities, next_cursor = await keyset_page(
+            db, select(HealthcareFacility), None, HealthcareFacility.id, cursor, limit
         )
-    
-    facilities = query.all()
+    else:
+        # Distance-sorted matches come from the in-memory index; the cursor
+        # is a position in that list
+        ranked = facility_index.within(latitude, longitude, radius)
+        start = decode_offset(cursor)
+        facilities = await _facilities_by_distance(db, ranked[start:start + limit])
+        next_cursor = encode_cursor(start + limit) if start + limit < len(ranked) else None
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return facilities
 
+@router.get("/resources/facilities/nearest", response_model=List[FacilityDistanceResponse])
+async def nearest_facilities(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    return await _facilities_by_distance(db, facility_index.nearest(latitude, longitude, k))
+
 @router.get("/resources/emergency-contacts", response_model=List[EmergencyContactResponse])
 async def get_emergency_contacts(
-    db: Session = Depends(get_db),
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    contacts = db.query(EmergencyContact).all()
+    query = select(EmergencyContact)
+    if stream:
+        return stream_ndjson(query.order_by(EmergencyContact.id))
+
+    contacts, next_cursor = await keyset_page(db, query, None, EmergencyContact.id, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return contacts
 
-@router.get("/resources/{resource_id}")
-async def get_resource(
+@router.api_route("/resources/{resource_id}/download", methods=["GET", "HEAD"])
+async def download_resource(
     resource_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    resource = await db.get(Resource, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
-    return resource
+
+    try:
+        response = await file_response(
+            request,
+            resource.file_path,
+            filename=resource.filename,
+            media_type=resource.content_type
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Resource file not found")
+
+    # Count a download once per transfer, not per resumed range, revalidation or HEAD
+    content_range = response.headers.get("content-range", "")
+    if request.method != "HEAD" and (
+        response.status_code == 200 or content_range.startswith("bytes 0-")
+    ):
+        client_ip = request.client.host if request.client else None
+        activity_buffer.record_download(resource_id, current_user.id, client_ip)
+        recommender.record(current_user.id, resource_id, DOWNLOAD_WEIGHT)
+    return response
 
 @router.post("/resources/{resource_id}/download")
-async def download_resource(
+async def download_resource_legacy(
     resource_id: int,
     download: ResourceDownloadCreate,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    resource = db.query(Resource).filter(Resource.id == resource_id).first()
+    # Kept for existing clients; new clients should GET the download
+    resource = await db.get(Resource, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
 
-    # Record download
-    download_record = ResourceDownload(
-        resource_id=resource_id,
-        user_id=current_user.id,
-        downloaded_at=datetime.utcnow(),
-        ip_address=download.ip_address
-    )
-    db.add(download_record)
-    
-    # Update download count
-    resource.download_count += 1
-    
-    db.commit()
-    
-    # Return file
-    return FileResponse(
-        path=resource.file_path,
-        filename=resource.filename,
-        media_type=resource.content_type
-    )
+    try:
+        response = await file_response(
+            request,
+            resource.file_path,
+            filename=resource.filename,
+            media_type=resource.content_type
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Resource file not found")
+    activity_buffer.record_download(resource_id, current_user.id, download.ip_address)
+    recommender.record(current_user.id, resource_id, DOWNLOAD_WEIGHT)
+    return response
 
 @router.post("/resources/track-view")
 async def track_resource_view(
     view: ResourceViewCreate,
-    db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    view_record = ResourceView(
-        resource_id=view.resource_id,
-        user_id=current_user.id,
-        viewed_at=datetime.utcnow(),
-        ip_address=view.ip_address
-    )
-    db.add(view_record)
-    db.commit()
+    activity_buffer.record_view(view.resource_id, current_user.id, view.ip_address)
+    recommender.record(current_user.id, view.resource_id, VIEW_WEIGHT)
     return {"success": True}
 
 @router.get("/resources/search")
 async def search_resources(
+    response: Response,
     query: str = Query(None),
     category: str = Query(None),
     type: str = Query(None),
     sort_by: str = Query("relevance"),
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    search_query = db.query(Resource)
+    search_query = select(Resource)
 
+    ranks = None
     if query:
-        search_query = search_query.filter(
-            or_(
-                Resource.title.ilike(f"%{query}%"),
-                Resource.description.ilike(f"%{query}%")
-            )
-        )
+        ranked = resource_index.search(query, {"category": category, "type": type})
+        if not ranked:
+            return []
+        ranks = {doc_id: position for position, (doc_id, _) in enumerate(ranked)}
 
     if category:
-        search_query = search_query.filter(Resource.category == category)
+        search_query = search_query.where(Resource.category == category)
 
     if type:
-        search_query = search_query.filter(Resource.type == type)
+        search_query = search_query.where(Resource.type == type)
 
     # Apply sorting
     if sort_by == "popular":
-        search_query = search_query.order_by(Resource.download_count.desc())
-    elif sort_by == "recent":
-        search_query = search_query.order_by(Resource.created_at.desc())
-    elif sort_by == "relevance" and query:
-        # Implement full-text search ranking if available
-        pass
-
-    resources = search_query.all()
+        sort_column, descending = Resource.download_count, True
+    else:
+        sort_column, descending = Resource.created_at, True
+
+    if ranks is not None and (stream or sort_by != "relevance"):
+        # Sorted in SQL, so filter to the best hits there
+        search_query = search_query.where(Resource.id.in_(list(ranks)[:SORTED_SEARCH_LIMIT]))
+
+    if stream:
+        order = sort_column.desc() if descending else sort_column.asc()
+        return stream_ndjson(search_query.order_by(order, Resource.id.desc()))
+
+    if sort_by == "relevance" and ranks is not None:
+        # Ranked ids live in memory, so the cursor is just a position in them
+        start = decode_offset(cursor)
+        page_ids = list(ranks)[start:start + limit]
+        resources = (await db.scalars(search_query.where(Resource.id.in_(page_ids)))).all()
+        resources.sort(key=lambda r: ranks[r.id])
+        next_cursor = encode_cursor(start + limit) if start + limit < len(ranks) else None
+    else:
+        resources, next_cursor = await keyset_page(
+            db, search_query, sort_column, Resource.id, cursor, limit, descending=descending
+        )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return resources
 
+@router.get("/resources/search/facets")
+async def search_resource_facets(
+    query: str = Query(None),
+    current_user = Depends(get_current_user)
+):
+    doc_ids = None
+    if query:
+        doc_ids = [doc_id for doc_id, _ in resource_index.search(query)]
+    return resource_index.facet_counts(doc_ids)
+
 @router.get("/resources/recommended")
 async def get_recommended_resources(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    # Get user's recent views and downloads
-    recent_interactions = db.query(
-        ResourceView.resource_id,
-        ResourceDownload.resource_id
-    ).filter(
-        or_(
-            ResourceView.user_id == current_user.id,
-            ResourceDownload.user_id == current_user.id
-        )
-    ).order_by(
-        func.coalesce(ResourceView.viewed_at, ResourceDownload.downloaded_at).desc()
-    ).limit(10).all()
-
-    # Get similar resources based on categories and tags
-    recent_resource_ids = [r[0] for r in recent_interactions if r[0]]
-    if recent_resource_ids:
-        similar_resources = db.query(Resource).filter(
-            and_(
-                Resource.id.notin_(recent_resource_ids),
-                or_(
-                    Resource.category.in_(db.query(Resource.category).filter(
-                        Resource.id.in_(recent_resource_ids)
-                    )),
-                    Resource.tags.overlap(db.query(Resource.tags).filter(
-                        Resource.id.in_(recent_resource_ids)
-                    ))
-                )
-            )
-        ).order_by(
-            Resource.download_count.desc()
-        ).limit(5).all()
-        
-        return similar_resources
-    
-    # If no recent interactions, return popular resources
-    return db.query(Resource).order_by(
-        Resource.download_count.desc()
-    ).limit(5).all()
\ No newline at end of file
+    resource_ids = recommender.recommend(current_user.id, k=5)
+    if not resource_ids:
+        return []
+    rows = (await db.scalars(select(Resource).where(Resource.id.in_(resource_ids)))).all()
+    position = {resource_id: i for i, resource_id in enumerate(resource_ids)}
+    return sorted(rows, key=lambda r: position[r.id])
+
+# Declared last so the static /resources/... paths above are matched first
+@router.get("/resources/{resource_id}")
+async def get_resource(
+    resource_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    resource = await db.get(Resource, resource_id)
+    if not resource:
+        raise HTTPException(status_code=404, detail="Resource not found")
+    return resource
@@ -1,9 +1,57 @@
+import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from sqlalchemy import exists, select
+from app.async_database import AsyncSessionLocal
+from app.models.community import ForumTopic
+from app.models.course import Course, Enrollment
+from app.models.event import Event, EventRegistration
 from app.websockets.connection_manager import ConnectionManager
+from app.websockets.pubsub import backend_from_url
 from app.auth.dependencies import get_current_user_ws
+from app.config import settings
 
 router = APIRouter()
-manager = ConnectionManager()
+# e.g. WS_PUBSUB_URL=redis://localhost:6379 when running several workers
+manager = ConnectionManager(bus=backend_from_url(getattr(settings, "WS_PUBSUB_URL", None)))
+
+@router.on_event("startup")
+async def start_connection_manager():
+    await manager.start()
+
+@router.on_event("shutdown")
+async def stop_connection_manager():
+    await manager.stop()
+
+async def can_join(user, channel: str) -> bool:
+    """Course channels are for enrollees and the instructor, event channels
+    for registrants and the speaker; forum topics are public"""
+    kind, _, raw_id = channel.partition(":")
+    target_id = int(raw_id)
+    # A short-lived session: the socket may stay open for hours
+    async with AsyncSessionLocal() as db:
+        if kind == "course":
+            return bool(await db.scalar(select(
+                exists().where(Enrollment.course_id == target_id, Enrollment.user_id == user.id)
+                | exists().where(Course.id == target_id, Course.instructor_id == user.id)
+            )))
+        if kind == "event":
+            return bool(await db.scalar(select(
+                exists().where(EventRegistration.event_id == target_id,
+                               EventRegistration.user_id == user.id)
+                | exists().where(Event.id == target_id, Event.speaker_id == user.id)
+            )))
+        if kind == "topic":
+            return bool(await db.scalar(select(exists().where(ForumTopic.id == target_id))))
+    return False
+
+MESSAGE_TYPES = ("subscribe", "unsubscribe", "chat_message", "typing_indicator")
+
+async def send_error(websocket: WebSocket, message: str, channel=None):
+    await manager.send_to_connection(websocket, {
+        "type": "error",
+        "message": message,
+        "channel": channel
+    })
 
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(
@@ -14,19 +62,57 @@ async def websocket_endpoint(
     await manager.connect(websocket, current_user.id)
     try:
         while True:
-            data = await websocket.receive_json()
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                await send_error(websocket, "Messages must be JSON")
+                continue
+            if not isinstance(data, dict) or data.get("type") not in MESSAGE_TYPES:
+                await send_error(websocket, "Unknown message type")
+                continue
+            channel = data.get("channel")
+            if not manager.is_valid_channel(channel):
+                await send_error(websocket, "Invalid channel", channel if isinstance(channel, str) else None)
+                continue
             # Handle different types of real-time events
-            if data["type"] == "chat_message":
-                await manager.broadcast({
+            if data["type"] == "subscribe":
+                if not await can_join(current_user, channel):
+                    await send_error(websocket, "Not a member of this channel", channel)
+                elif await manager.subscribe(websocket, channel):
+                    await manager.send_to_connection(websocket, {
+                        "type": "subscribed",
+                        "channel": channel
+                    })
+                else:
+                    await send_error(websocket, "Invalid channel", channel)
+            elif data["type"] == "unsubscribe":
+                manager.unsubscribe(websocket, channel)
+                await manager.send_to_connection(websocket, {
+                    "type": "unsubscribed",
+                    "channel": channel
+                })
+            elif not manager.is_subscribed(websocket, channel):
+                await send_error(websocket, "Subscribe to the channel before sending to it", channel)
+            elif data["type"] == "chat_message":
+                message = data.get("message")
+                if not isinstance(message, str) or not message:
+                    await send_error(websocket, "chat_message needs a message", channel)
+                    continue
+                await manager.publish(channel, {
                     "type": "chat_message",
+                    "channel": channel,
                     "user": current_user.username,
-                    "message": data["message"]
+                    "message": message
                 })
-            elif data["type"] == "typing_indicator":
-                await manager.broadcast({
+            else:
+                await manager.publish(channel, {
                     "type": "typing_indicator",
+                    "channel": channel,
                     "user": current_user.username,
-                    "isTyping": data["isTyping"]
+                    "isTyping": bool(data.get("isTyping"))
                 })
     except WebSocketDisconnect:
-        await manager.disconnect(websocket, current_user.id)
\ No newline at end of file
+        pass
+    finally:
+        # Also on errors, or the connection would stay registered forever
+        await manager.disconnect(websocket, current_user.id)
@@ -0,0 +1,5 @@
+from typing import Dict
+from pydantic import BaseModel
+
+class AttemptSubmission(BaseModel):
+    answers: Dict[str, str]  # question id -> answer
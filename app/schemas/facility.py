@@ -0,0 +1,6 @@
+from typing import Optional
+from app.schemas.resource import FacilityResponse
+
+class FacilityDistanceResponse(FacilityResponse):
+    # Set when the facilities were searched around a point
+    distance_km: Optional[float] = None
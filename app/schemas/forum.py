@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+
+class TopicCreate(BaseModel):
+    title: str = Field(..., max_length=200)
+    content: str
+    category: str = Field(..., max_length=50)
+
+class ReplyCreate(BaseModel):
+    content: str
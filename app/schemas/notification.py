@@ -0,0 +1,6 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class MarkReadRequest(BaseModel):
+    # Omit ids to mark the whole inbox read
+    ids: Optional[List[int]] = Field(None, max_length=1000)
@@ -0,0 +1,12 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class LessonProgressEvent(BaseModel):
+    course_id: int
+    lesson_id: Optional[int] = None
+    progress_percentage: float = Field(..., ge=0, le=100)
+    occurred_at: Optional[datetime] = None  # naive values are taken as UTC
+
+class ProgressBatch(BaseModel):
+    events: List[LessonProgressEvent] = Field(..., max_length=500)
@@ -1,10 +1,73 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from app.config import settings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+import asyncio
+import os
 import bcrypt
 
+# bcrypt work factor for new hashes; raising it upgrades users as they log in
+BCRYPT_ROUNDS = getattr(settings, "BCRYPT_ROUNDS", 12)
+
+# Values per task sent to the crypto pool; small enough to spread the
+# work, large enough that pickling does not dominate
+CRYPTO_CHUNK = 2000
+
+# Batches up to this size run inline; anything bigger would hold up the
+# event loop, so it goes to a thread or the process pool
+INLINE_CRYPTO_LIMIT = 32
+
+class HashingBusy(Exception):
+    """Raised when too many hash operations are already waiting"""
+
+def encryption_keys() -> List[str]:
+    """Configured keys, newest first: ENCRYPTION_KEYS, else ENCRYPTION_KEY"""
+    keys = getattr(settings, "ENCRYPTION_KEYS", None) or [settings.ENCRYPTION_KEY]
+    if isinstance(keys, str):
+        keys = [key.strip() for key in keys.split(",") if key.strip()]
+    return list(keys)
+
+def _cipher_for(keys: Sequence[str]) -> MultiFernet:
+    return MultiFernet([Fernet(key) for key in keys])
+
+# State of a crypto pool worker process, set once by its initializer
+_worker_cipher: Optional[MultiFernet] = None
+
+def _init_worker(keys: Sequence[str]):
+    global _worker_cipher
+    _worker_cipher = _cipher_for(keys)
+
+def _apply(cipher: MultiFernet, op: str, values: Sequence[str],
+           skip_invalid: bool = False) -> List[Optional[str]]:
+    # op is "encrypt", "decrypt" or "rotate"
+    fn = getattr(cipher, op)
+    if not skip_invalid:
+        return [fn(v.encode()).decode() for v in values]
+    results = []
+    for v in values:
+        try:
+            results.append(fn(v.encode()).decode())
+        except InvalidToken:
+            results.append(None)
+    return results
+
+def _apply_in_worker(op: str, values: Sequence[str], skip_invalid: bool) -> List[Optional[str]]:
+    return _apply(_worker_cipher, op, values, skip_invalid)
+
 class DataProtection:
-    def __init__(self):
-        self.cipher_suite = Fernet(settings.ENCRYPTION_KEY)
+    """Field encryption with one or more Fernet keys
+
+    The first key encrypts; every key can decrypt, so a new key can be put
+    in front while existing rows are rotated in the background. The batch
+    methods split large lists across a process pool because Fernet's cost
+    per value is mostly Python overhead that threads would serialize.
+    """
+
+    def __init__(self, keys: Optional[Sequence[str]] = None, workers: Optional[int] = None):
+        self.keys = list(keys or encryption_keys())
+        self.cipher_suite = _cipher_for(self.keys)
+        self.workers = workers or getattr(settings, "ENCRYPTION_WORKERS", None) or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
 
     def encrypt_sensitive_data(self, data: str) -> str:
         """Encrypt sensitive user data"""
@@ -14,13 +77,146 @@ class DataProtection:
         """Decrypt sensitive user data"""
         return self.cipher_suite.decrypt(encrypted_data.encode()).decode()
 
+    def rotate_sensitive_data(self, encrypted_data: str) -> str:
+        """Re-encrypt data under the primary key"""
+        return self.cipher_suite.rotate(encrypted_data.encode()).decode()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.keys,)
+            )
+        return self._pool
+
+    async def _map(self, op: str, values: Sequence[str],
+                   skip_invalid: bool = False) -> List[Optional[str]]:
+        values = list(values)
+        if len(values) <= INLINE_CRYPTO_LIMIT:
+            return _apply(self.cipher_suite, op, values, skip_invalid)
+        if len(values) <= CRYPTO_CHUNK or self.workers == 1:
+            # Not worth a round trip to another process, but off the loop
+            return await asyncio.to_thread(_apply, self.cipher_suite, op, values, skip_invalid)
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, _apply_in_worker, op, values[i:i + CRYPTO_CHUNK], skip_invalid)
+            for i in range(0, len(values), CRYPTO_CHUNK)
+        ))
+        return [value for chunk in chunks for value in chunk]
+
+    async def encrypt_many(self, values: Sequence[str]) -> List[str]:
+        """Encrypt a batch, preserving order"""
+        return await self._map("encrypt", values)
+
+    async def decrypt_many(self, values: Sequence[str]) -> List[str]:
+        """Decrypt a batch, preserving order"""
+        return await self._map("decrypt", values)
+
+    async def rotate_many(self, values: Sequence[str], skip_invalid: bool = False) -> List[Optional[str]]:
+        """Re-encrypt a batch under the primary key, preserving order
+
+        With skip_invalid, a value no key can decrypt comes back as None
+        instead of failing the whole batch.
+        """
+        return await self._map("rotate", values, skip_invalid)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
     @staticmethod
-    def hash_password(password: str) -> str:
+    def hash_password(password: str, rounds: Optional[int] = None) -> str:
         """Hash user password using bcrypt"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
         return bcrypt.hashpw(password.encode(), salt).decode()
 
     @staticmethod
     def verify_password(password: str, hashed_password: str) -> bool:
         """Verify password against stored hash"""
-        return bcrypt.checkpw(password.encode(), hashed_password.encode())
\ No newline at end of file
+        return bcrypt.checkpw(password.encode(), hashed_password.encode())
+
+    @staticmethod
+    def needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+        """True if the hash was made with a different work factor"""
+        try:
+            cost = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return cost != (rounds or BCRYPT_ROUNDS)
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded thread pool
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without pickling overhead. At most max_workers hashes run at once and
+    at most max_pending wait behind them; beyond that HashingBusy is raised
+    straight away so a login storm is shed instead of queuing without bound.
+    """
+
+    def __init__(self, rounds: Optional[int] = None, max_workers: Optional[int] = None,
+                 max_pending: int = 64):
+        self.rounds = rounds or BCRYPT_ROUNDS
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self.rejected += 1
+            raise HashingBusy("Too many password operations in progress")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        self._in_flight += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(DataProtection.hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Check a password; on success also return a new hash if the cost changed
+
+        Callers should store the second value when it is not None. This is
+        the only moment the plaintext is available to upgrade the hash.
+        """
+        valid = await self._run(DataProtection.verify_password, password, hashed_password)
+        if not valid or not DataProtection.needs_rehash(hashed_password, self.rounds):
+            return valid, None
+        try:
+            new_hash = await self.hash(password)
+        except HashingBusy:
+            # The password is already verified; upgrade it on a later login
+            return True, None
+        self.rehashed += 1
+        return True, new_hash
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "workers": self.max_workers,
+            "inFlight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed
+        }
+
+password_hasher = PasswordHasher(
+    max_workers=getattr(settings, "BCRYPT_WORKERS", None),
+    max_pending=getattr(settings, "BCRYPT_MAX_PENDING", 64)
+)
@@ -0,0 +1,14 @@
+from fastapi import Depends, HTTPException, status
+from app.auth.dependencies import get_current_user
+
+def is_admin(user) -> bool:
+    # Accounts without the flag are never administrators
+    return bool(getattr(user, "is_admin", False))
+
+async def require_admin(current_user = Depends(get_current_user)):
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
+    return current_user
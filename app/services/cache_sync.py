@@ -0,0 +1,96 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Callable, Dict, Optional, Set
+from app.config import settings
+from app.utils.transactions import after_commit
+from app.websockets.pubsub import PubSubBackend, backend_from_url
+
+logger = logging.getLogger(__name__)
+
+SYNC_TOPIC = "changes"
+
+class CacheSync:
+    """Applies committed row changes to in-process indexes on every worker
+
+    Each index registers an apply function under a name. on_commit()
+    defers (name, args) until the writing session commits. The change is
+    then applied locally and published on the bus, and every other worker
+    applies it too. Without a bus (a single worker) changes stay local.
+    Arguments must be JSON-serializable.
+    """
+
+    def __init__(self, bus: Optional[PubSubBackend] = None):
+        self.bus = bus
+        self.node_id = uuid.uuid4().hex
+        self._appliers: Dict[str, Callable] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._started = False
+        self.published = 0
+        self.received = 0
+
+    def register(self, name: str, apply: Callable):
+        self._appliers[name] = apply
+
+    def on_commit(self, target, name: str, *args):
+        after_commit(target, self.apply, name, *args)
+
+    def apply(self, name: str, *args):
+        self._appliers[name](*args)
+        if self.bus is None or not self._started:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.warning("Change %s committed outside the event loop was not published", name)
+            return
+        payload = json.dumps([self.node_id, name, list(args)], separators=(",", ":"))
+        task = loop.create_task(self._publish(payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, payload: str):
+        try:
+            await self.bus.publish(SYNC_TOPIC, payload)
+            self.published += 1
+        except Exception:
+            logger.exception("Publishing an index change failed; other workers may be stale")
+
+    async def _on_message(self, topic: str, payload: str):
+        node_id, name, args = json.loads(payload)
+        if node_id == self.node_id:
+            return
+        self.received += 1
+        apply = self._appliers.get(name)
+        if apply is not None:
+            apply(*args)
+
+    async def start(self):
+        """Idempotent; every router that owns a synced index calls it"""
+        if self.bus is None or self._started:
+            return
+        self._started = True
+        await self.bus.start(self._on_message)
+        await self.bus.subscribe(SYNC_TOPIC)
+
+    async def stop(self):
+        if not self._started:
+            return
+        self._started = False
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.bus.stop()
+
+    def stats(self) -> dict:
+        return {
+            "bus": self.bus is not None,
+            "published": self.published,
+            "received": self.received
+        }
+
+# Shares the websocket bus server by default, under its own topic prefix
+cache_sync = CacheSync(bus=backend_from_url(
+    getattr(settings, "CACHE_SYNC_URL", None) or getattr(settings, "WS_PUBSUB_URL", None),
+    prefix="sync:"
+))
@@ -0,0 +1,30 @@
+from typing import Any
+from sqlalchemy import event, inspect
+from app.models.course import Course
+from app.services.cache_sync import cache_sync
+from app.utils.cache import TTLCache
+
+class CatalogCache(TTLCache):
+    """In-process LRU cache for shared course catalog pages"""
+
+def snapshot_course(course: Course) -> dict:
+    """Copy a course's column values so it can outlive its session"""
+    return {
+        attr.key: getattr(course, attr.key)
+        for attr in inspect(Course).column_attrs
+    }
+
+catalog_cache = CatalogCache()
+
+cache_sync.register("catalog:invalidate", catalog_cache.invalidate)
+
+def invalidate_on_commit(target: Any):
+    """Drop the catalog on every worker once target's session commits"""
+    # Not at flush time: a concurrent read could re-cache the old rows
+    cache_sync.on_commit(target, "catalog:invalidate")
+
+def _invalidate_catalog(mapper, connection, target: Any):
+    invalidate_on_commit(target)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Course, _event_name, _invalidate_catalog)
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Iterator, List, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import AsyncSessionLocal
+from app.models.event import Event, EventRegistration
+from app.services.cache_sync import cache_sync
+from app.utils.cache import TTLCache
+from app.utils.pagination import row_to_dict
+
+ICAL_PRODID = "-//Learning Platform//Events//EN"
+DEFAULT_EVENT_MINUTES = 60
+
+# Calendar months keyed (year, month); dropped on every worker when a
+# change to one of their events commits
+month_cache = TTLCache(max_entries=240, ttl=600.0)
+
+def month_of(moment: datetime) -> Tuple[int, int]:
+    return moment.year, moment.month
+
+def _month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    start = datetime(year, month, 1)
+    end = datetime(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+def months_between(start: datetime, end: datetime) -> Iterator[Tuple[int, int]]:
+    year, month = month_of(start)
+    while datetime(year, month, 1) < end:
+        yield year, month
+        year, month = year + (month == 12), month % 12 + 1
+
+async def _load_month(db: AsyncSession, year: int, month: int) -> List[dict]:
+    cached = month_cache.get((year, month))
+    if cached is not None:
+        return cached
+    start, end = _month_bounds(year, month)
+    events = (await db.scalars(
+        select(Event)
+        .where(Event.datetime >= start, Event.datetime < end)
+        .order_by(Event.datetime, Event.id)
+    )).all()
+    snapshots = [row_to_dict(e) for e in events]
+    month_cache.set((year, month), snapshots)
+    return snapshots
+
+async def events_between(db: AsyncSession, start: datetime, end: datetime) -> List[dict]:
+    """Events starting in [start, end), assembled from cached calendar months
+
+    Each month is one range scan on the Event.datetime index the first
+    time it is asked for and a cache hit afterwards.
+    """
+    results = []
+    for year, month in months_between(start, end):
+        results.extend(
+            e for e in await _load_month(db, year, month)
+            if start <= e["datetime"] < end
+        )
+    return results
+
+def _escape(text: str) -> str:
+    return (text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _fold(line: str) -> str:
+    # RFC 5545: lines longer than 75 octets continue after CRLF + space
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start = [], 0
+    while start < len(encoded):
+        size = 75 if start == 0 else 74
+        end = min(start + size, len(encoded))
+        # Never split a multi-byte character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+def _ical_time(moment: datetime) -> str:
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+def vevent(e: Event, stamp: datetime) -> str:
+    end = e.datetime + timedelta(minutes=e.duration or DEFAULT_EVENT_MINUTES)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{e.id}@events",
+        f"DTSTAMP:{_ical_time(stamp)}",
+        f"DTSTART:{_ical_time(e.datetime)}",
+        f"DTEND:{_ical_time(end)}",
+        f"SUMMARY:{_escape(e.title)}",
+    ]
+    if e.description:
+        lines.append(f"DESCRIPTION:{_escape(e.description)}")
+    if e.updated_at:
+        lines.append(f"LAST-MODIFIED:{_ical_time(e.updated_at)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+async def ical_feed(user_id: int, chunk_size: int = 200) -> AsyncIterator[bytes]:
+    """The user's registered events as an iCalendar stream
+
+    Owns its session like the NDJSON streams, since the body is sent after
+    the request's session is closed.
+    """
+    stamp = datetime.utcnow()
+    yield ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+           f"PRODID:{ICAL_PRODID}\r\nCALSCALE:GREGORIAN\r\n").encode()
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(
+            select(Event)
+            .join(EventRegistration, EventRegistration.event_id == Event.id)
+            .where(EventRegistration.user_id == user_id)
+            .order_by(Event.datetime, Event.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for events in result.partitions():
+            yield "".join(vevent(e, stamp) for e in events).encode()
+    yield b"END:VCALENDAR\r\n"
+
+def _discard_months(months: List[List[int]]):
+    for year, month in months:
+        month_cache.discard((year, month))
+
+cache_sync.register("calendar:months", _discard_months)
+
+def _on_event_change(mapper, connection, target: Event):
+    months = [month_of(target.datetime)]
+    moved = inspect(target).attrs.datetime.history.deleted
+    if moved and moved[0] is not None:
+        months.append(month_of(moved[0]))
+    cache_sync.on_commit(target, "calendar:months", months)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Event, _event_name, _on_event_change)
@@ -0,0 +1,166 @@
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.event import Event, EventRegistration, EventWaitlistEntry
+
+class RegistrationError(Exception):
+    pass
+
+class EventNotFound(RegistrationError):
+    pass
+
+class AlreadyRegistered(RegistrationError):
+    pass
+
+@dataclass
+class RegistrationResult:
+    registered: bool
+    waitlist_position: Optional[int] = None
+
+def _seat_available():
+    return or_(
+        Event.max_attendees.is_(None),
+        Event.current_attendees < Event.max_attendees
+    )
+
+async def _waitlist_position(db: AsyncSession, entry: EventWaitlistEntry) -> int:
+    return await db.scalar(select(func.count()).where(
+        EventWaitlistEntry.event_id == entry.event_id,
+        EventWaitlistEntry.id <= entry.id
+    ))
+
+async def _promote_next(db: AsyncSession, event_id: int) -> bool:
+    """Give one seat the caller holds to the head of the waitlist
+
+    Heads locked by a concurrent promotion are skipped. A head who got
+    registered some other way only loses their stale entry. Returns
+    False when nobody could take the seat.
+    """
+    while True:
+        head = await db.scalar(
+            select(EventWaitlistEntry)
+            .where(EventWaitlistEntry.event_id == event_id)
+            .order_by(EventWaitlistEntry.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        if head is None:
+            return False
+        await db.delete(head)
+        try:
+            async with db.begin_nested():
+                db.add(EventRegistration(user_id=head.user_id, event_id=event_id))
+        except IntegrityError:
+            continue
+        return True
+
+def _release_seat(event_id: int):
+    return (
+        update(Event)
+        .where(Event.id == event_id, Event.current_attendees > 0)
+        .values(current_attendees=Event.current_attendees - 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def _fill_free_seats(db: AsyncSession, event_id: int):
+    """Promote waiting users into seats left free while the waitlist was busy"""
+    while True:
+        claimed = await db.execute(
+            update(Event)
+            .where(Event.id == event_id, _seat_available())
+            .values(current_attendees=Event.current_attendees + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if claimed.rowcount == 0:
+            return
+        if not await _promote_next(db, event_id):
+            await db.execute(_release_seat(event_id))
+            return
+
+async def register(db: AsyncSession, event_id: int, user_id: int) -> RegistrationResult:
+    """Reserve a seat, or join the FIFO waitlist when the event is full
+
+    The seat is claimed with a single conditional UPDATE, so concurrent
+    registrations can never push current_attendees past max_attendees.
+    A free seat is only claimed when nobody else is waiting for it.
+    Duplicate registrations are rejected by the unique constraints.
+    """
+    others_waiting = select(EventWaitlistEntry.id).where(
+        EventWaitlistEntry.event_id == event_id,
+        EventWaitlistEntry.user_id != user_id
+    ).exists()
+    claimed = await db.execute(
+        update(Event)
+        .where(Event.id == event_id, _seat_available(), ~others_waiting)
+        .values(current_attendees=Event.current_attendees + 1)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        if claimed.rowcount == 1:
+            db.add(EventRegistration(user_id=user_id, event_id=event_id))
+            # A waitlisted caller who got a seat leaves the waitlist
+            await db.execute(delete(EventWaitlistEntry).where(
+                EventWaitlistEntry.user_id == user_id,
+                EventWaitlistEntry.event_id == event_id
+            ))
+            await db.commit()
+            return RegistrationResult(registered=True)
+
+        if await db.scalar(select(Event.id).where(Event.id == event_id)) is None:
+            raise EventNotFound(event_id)
+        already = await db.scalar(select(EventRegistration.id).where(
+            EventRegistration.user_id == user_id,
+            EventRegistration.event_id == event_id
+        ))
+        if already is not None:
+            raise AlreadyRegistered(event_id)
+
+        entry = await db.scalar(select(EventWaitlistEntry).where(
+            EventWaitlistEntry.user_id == user_id,
+            EventWaitlistEntry.event_id == event_id
+        ))
+        if entry is None:
+            entry = EventWaitlistEntry(user_id=user_id, event_id=event_id)
+            db.add(entry)
+            await db.flush()
+        entry_id = entry.id
+        await _fill_free_seats(db, event_id)
+        promoted = await db.scalar(select(EventWaitlistEntry.id).where(
+            EventWaitlistEntry.id == entry_id
+        )) is None
+        position = None if promoted else await _waitlist_position(db, entry)
+        await db.commit()
+        return RegistrationResult(registered=promoted, waitlist_position=position)
+    except IntegrityError:
+        # Rolling back also releases the seat claimed above
+        await db.rollback()
+        raise AlreadyRegistered(event_id)
+    except RegistrationError:
+        await db.rollback()
+        raise
+
+async def cancel(db: AsyncSession, event_id: int, user_id: int) -> bool:
+    """Drop a registration or waitlist entry, handing a freed seat to the next in line"""
+    removed = await db.execute(
+        delete(EventRegistration).where(
+            EventRegistration.user_id == user_id,
+            EventRegistration.event_id == event_id
+        )
+    )
+    if removed.rowcount == 0:
+        dequeued = await db.execute(
+            delete(EventWaitlistEntry).where(
+                EventWaitlistEntry.user_id == user_id,
+                EventWaitlistEntry.event_id == event_id
+            )
+        )
+        await db.commit()
+        return dequeued.rowcount > 0
+
+    # The seat moves straight to the waitlisted user; the count is unchanged
+    if not await _promote_next(db, event_id):
+        await db.execute(_release_seat(event_id))
+    await db.commit()
+    return True
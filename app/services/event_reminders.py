@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import AsyncSessionLocal
+from app.config import settings
+from app.models.event import Event
+from app.services.cache_sync import cache_sync
+from app.services.job_queue import enqueue, job_handler
+from app.services.notification_service import NotificationService, NotificationType
+
+logger = logging.getLogger(__name__)
+
+REMINDER_JOB = "event_reminder"
+REMINDER_LEAD = timedelta(minutes=getattr(settings, "EVENT_REMINDER_LEAD_MINUTES", 24 * 60))
+
+class ReminderScheduler:
+    """Min-heap of upcoming event reminders, woken only when one is due
+
+    Each entry is (remind_at, event_id, starts_at). Rescheduling an event
+    just pushes a new entry; the old one is recognised as stale when its
+    job runs because starts_at no longer matches. Due reminders are handed
+    to the job queue, whose idempotency key stops several workers (or a
+    restart) from sending the same reminder twice.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, lead: timedelta = REMINDER_LEAD):
+        self.session_factory = session_factory
+        self.lead = lead
+        self._heap: List[Tuple[datetime, int, datetime]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.dispatched = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, event_id: int, starts_at: datetime):
+        if starts_at is None or starts_at <= datetime.utcnow():
+            return
+        entry = (starts_at - self.lead, event_id, starts_at)
+        heapq.heappush(self._heap, entry)
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def load(self, db: AsyncSession):
+        """Schedule every upcoming event, e.g. at application startup"""
+        self._heap = []
+        result = await db.stream(
+            select(Event.id, Event.datetime)
+            .where(Event.datetime > datetime.utcnow())
+            .execution_options(yield_per=5000)
+        )
+        async for event_id, starts_at in result:
+            self._heap.append((starts_at - self.lead, event_id, starts_at))
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _pop_due(self) -> List[Tuple[int, datetime]]:
+        now = datetime.utcnow()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, event_id, starts_at = heapq.heappop(self._heap)
+            if starts_at > now:
+                due.append((event_id, starts_at))
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due()
+            if due:
+                try:
+                    async with self.session_factory() as db:
+                        for event_id, starts_at in due:
+                            await enqueue(
+                                db, REMINDER_JOB,
+                                {"event_id": event_id, "starts_at": starts_at.isoformat()},
+                                idempotency_key=f"{REMINDER_JOB}:{event_id}:{starts_at.isoformat()}"
+                            )
+                        await db.commit()
+                    self.dispatched += len(due)
+                except Exception:
+                    logger.exception("Queueing %d event reminders failed, retrying", len(due))
+                    for event_id, starts_at in due:
+                        self.schedule(event_id, starts_at)
+                    await asyncio.sleep(5)
+                continue
+            timeout = None
+            if self._heap:
+                timeout = max((self._heap[0][0] - datetime.utcnow()).total_seconds(), 0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "scheduled": len(self._heap),
+            "nextReminderAt": self._heap[0][0] if self._heap else None,
+            "dispatched": self.dispatched
+        }
+
+reminder_scheduler = ReminderScheduler()
+
+@job_handler(REMINDER_JOB)
+async def send_event_reminder(db: AsyncSession, payload: dict):
+    event_row = await db.get(Event, payload["event_id"])
+    # Skip reminders for events that were deleted or moved since scheduling
+    if event_row is None or event_row.datetime.isoformat() != payload["starts_at"]:
+        return
+    await NotificationService(db).notify_event_attendees(
+        event_row.id,
+        NotificationType.EVENT_REMINDER,
+        f"Reminder: {event_row.title}",
+        f"{event_row.title} starts at {event_row.datetime:%Y-%m-%d %H:%M} UTC.",
+        commit=False
+    )
+
+def _schedule_committed(event_id: int, starts_at: str):
+    reminder_scheduler.schedule(event_id, datetime.fromisoformat(starts_at))
+
+cache_sync.register("reminders:schedule", _schedule_committed)
+
+# Scheduled once the event commits, on every worker; the job's idempotency
+# key still sends each reminder only once
+def _on_event_insert(mapper, connection, target: Event):
+    if target.datetime is not None:
+        cache_sync.on_commit(target, "reminders:schedule", target.id, target.datetime.isoformat())
+
+def _on_event_update(mapper, connection, target: Event):
+    if target.datetime is not None and inspect(target).attrs.datetime.history.has_changes():
+        cache_sync.on_commit(target, "reminders:schedule", target.id, target.datetime.isoformat())
+
+event.listen(Event, "after_insert", _on_event_insert)
+event.listen(Event, "after_update", _on_event_update)
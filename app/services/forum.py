@@ -0,0 +1,235 @@
+import heapq
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.community import ForumTopic, TopicReply
+from app.services.cache_sync import cache_sync
+
+class TopicNotFound(Exception):
+    pass
+
+def _timestamp(at: Optional[datetime]) -> float:
+    return (at - datetime(1970, 1, 1)).total_seconds() if at else time.time()
+
+class HotTopics:
+    """Incrementally maintained "hot" ranking of forum topics
+
+    Every reply adds weight that halves each half_life seconds. Instead
+    of decaying every score over time (forward decay), a reply at time t
+    adds 2 ** ((t - epoch) / half_life). All scores would decay by the same
+    factor, so the ordering is unchanged and a reply costs O(1). Scores are
+    also kept per category. A top-k list is recomputed once it is older
+    than refresh_interval, so new replies show up within that delay.
+    """
+
+    def __init__(self, half_life: float = 6 * 3600, refresh_interval: float = 5.0,
+                 max_topics: int = 50000):
+        self.half_life = half_life
+        self.refresh_interval = refresh_interval
+        self.max_topics = max_topics
+        self._epoch = time.time()
+        self._scores: Dict[int, float] = {}
+        self._categories: Dict[int, str] = {}
+        self._category_scores: Dict[str, Dict[int, float]] = {}
+        # category -> (expires, size asked for, ranking)
+        self._ranked: Dict[Optional[str], Tuple[float, int, List[Tuple[int, float]]]] = {}
+        self._lock = Lock()
+
+    def _weight(self, at: float) -> float:
+        exponent = (at - self._epoch) / self.half_life
+        if exponent > 900:
+            # Keep weights inside float range by moving the epoch forward
+            self._rebase(at)
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def _rebase(self, at: float):
+        shift = 2.0 ** ((at - self._epoch) / self.half_life)
+        self._set_scores({t: s / shift for t, s in self._scores.items() if s / shift > 1e-12})
+        self._epoch = at
+
+    def _set_scores(self, scores: Dict[int, float]):
+        self._scores = scores
+        self._category_scores = {}
+        for topic_id, score in scores.items():
+            category = self._categories.get(topic_id)
+            if category is not None:
+                self._category_scores.setdefault(category, {})[topic_id] = score
+
+    def _scores_for(self, topic_id: int) -> Optional[Dict[int, float]]:
+        category = self._categories.get(topic_id)
+        return None if category is None else self._category_scores.setdefault(category, {})
+
+    def set_category(self, topic_id: int, category: str):
+        with self._lock:
+            previous = self._scores_for(topic_id)
+            self._categories[topic_id] = category
+            score = self._scores.get(topic_id)
+            if score is not None:
+                if previous is not None:
+                    previous.pop(topic_id, None)
+                self._scores_for(topic_id)[topic_id] = score
+
+    def record(self, topic_id: int, at: Optional[datetime] = None):
+        self.adjust(topic_id, _timestamp(at), 1)
+
+    def adjust(self, topic_id: int, timestamp: float, replies: int):
+        """Add (or, for deleted replies, take back) the weight of replies at timestamp"""
+        with self._lock:
+            score = self._scores.get(topic_id)
+            if replies < 0 and score is None:
+                return
+            score = (score or 0.0) + replies * self._weight(timestamp)
+            in_category = self._scores_for(topic_id)
+            if score > 1e-12:
+                self._scores[topic_id] = score
+                if in_category is not None:
+                    in_category[topic_id] = score
+            else:
+                self._scores.pop(topic_id, None)
+                if in_category is not None:
+                    in_category.pop(topic_id, None)
+            if len(self._scores) > self.max_topics * 2:
+                # Drop the coldest half rather than growing without bound
+                keep = heapq.nlargest(self.max_topics, self._scores.items(), key=lambda item: item[1])
+                self._set_scores(dict(keep))
+
+    def remove(self, topic_id: int):
+        with self._lock:
+            in_category = self._scores_for(topic_id)
+            if in_category is not None:
+                in_category.pop(topic_id, None)
+            self._scores.pop(topic_id, None)
+            self._categories.pop(topic_id, None)
+            # Rare, and a deleted topic must not linger in cached lists
+            self._ranked.clear()
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+            self._categories.clear()
+            self._category_scores.clear()
+            self._ranked.clear()
+            self._epoch = time.time()
+
+    def top(self, k: int = 10, category: Optional[str] = None) -> List[Tuple[int, float]]:
+        """(topic_id, current score) pairs, hottest first"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._ranked.get(category)
+            if cached is not None and cached[0] > now and cached[1] >= k:
+                return cached[2][:k]
+            if category is None:
+                items = self._scores.items()
+            else:
+                items = self._category_scores.get(category, {}).items()
+            # Report scores in present-day units (decayed to now)
+            scale = 2.0 ** (-(time.time() - self._epoch) / self.half_life)
+            size = max(k, 50)
+            ranked = [
+                (topic_id, score * scale)
+                for topic_id, score in heapq.nlargest(size, items, key=lambda item: item[1])
+            ]
+            self._ranked[category] = (now + self.refresh_interval, size, ranked)
+            return ranked[:k]
+
+hot_topics = HotTopics()
+
+async def backfill_topic_activity(db: AsyncSession) -> int:
+    """Fill reply_count and last_reply_at on topics that predate them
+
+    Such rows have a NULL last_reply_at. Idempotent and cheap once done,
+    so it runs at every startup.
+    """
+    replies = select(func.count(TopicReply.id)).where(
+        TopicReply.topic_id == ForumTopic.id
+    ).scalar_subquery()
+    latest = select(func.max(TopicReply.created_at)).where(
+        TopicReply.topic_id == ForumTopic.id
+    ).scalar_subquery()
+    result = await db.execute(
+        update(ForumTopic)
+        .where(ForumTopic.last_reply_at.is_(None))
+        .values(
+            reply_count=replies,
+            last_reply_at=func.coalesce(latest, ForumTopic.created_at, datetime.utcnow())
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+async def rebuild_hot_topics(db: AsyncSession, window: timedelta = timedelta(days=7)):
+    """Replay recent replies into the ranking, e.g. at application startup"""
+    hot_topics.clear()
+    topics = await db.stream(
+        select(ForumTopic.id, ForumTopic.category).execution_options(yield_per=5000)
+    )
+    async for topic_id, category in topics:
+        hot_topics.set_category(topic_id, category)
+    replies = await db.stream(
+        select(TopicReply.topic_id, TopicReply.created_at)
+        .where(TopicReply.created_at >= datetime.utcnow() - window)
+        .execution_options(yield_per=10000)
+    )
+    async for topic_id, created_at in replies:
+        hot_topics.record(topic_id, created_at)
+
+async def add_reply(db: AsyncSession, topic_id: int, author_id: int, content: str) -> TopicReply:
+    """Insert a reply and bump its topic's counters in one transaction"""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(ForumTopic)
+        .where(ForumTopic.id == topic_id)
+        .values(reply_count=ForumTopic.reply_count + 1, last_reply_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise TopicNotFound(topic_id)
+    reply = TopicReply(topic_id=topic_id, author_id=author_id, content=content, created_at=now)
+    db.add(reply)
+    await db.commit()
+    return reply
+
+async def delete_reply(db: AsyncSession, reply: TopicReply):
+    topic_id = reply.topic_id
+    await db.delete(reply)
+    await db.flush()
+    last_reply_at = (
+        select(func.coalesce(func.max(TopicReply.created_at), ForumTopic.created_at))
+        .where(TopicReply.topic_id == topic_id)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(ForumTopic)
+        .where(ForumTopic.id == topic_id)
+        .values(reply_count=ForumTopic.reply_count - 1, last_reply_at=last_reply_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+cache_sync.register("forum:topic", hot_topics.set_category)
+cache_sync.register("forum:topic:remove", hot_topics.remove)
+cache_sync.register("forum:replies", hot_topics.adjust)
+
+# Applied once the flush's transaction commits, on every worker
+def _on_topic_write(mapper, connection, target: ForumTopic):
+    cache_sync.on_commit(target, "forum:topic", target.id, target.category)
+
+def _on_topic_delete(mapper, connection, target: ForumTopic):
+    cache_sync.on_commit(target, "forum:topic:remove", target.id)
+
+def _on_reply_insert(mapper, connection, target: TopicReply):
+    cache_sync.on_commit(target, "forum:replies", target.topic_id, _timestamp(target.created_at), 1)
+
+def _on_reply_delete(mapper, connection, target: TopicReply):
+    cache_sync.on_commit(target, "forum:replies", target.topic_id, _timestamp(target.created_at), -1)
+
+event.listen(ForumTopic, "after_insert", _on_topic_write)
+event.listen(ForumTopic, "after_update", _on_topic_write)
+event.listen(ForumTopic, "after_delete", _on_topic_delete)
+event.listen(TopicReply, "after_insert", _on_reply_insert)
+event.listen(TopicReply, "after_delete", _on_reply_delete)
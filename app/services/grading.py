@@ -0,0 +1,234 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.assessment import Assessment, AssessmentAttempt, AssessmentQuestion
+from app.services.cache_sync import cache_sync
+from app.utils.cache import TTLCache
+
+GRADE_BATCH = 5000
+
+def normalize_answer(value) -> str:
+    return str(value).strip().casefold()
+
+@dataclass
+class AnswerKey:
+    """An assessment's questions compiled to arrays for vectorized grading
+
+    Each answer becomes a small integer code: its position among the
+    question's choices, OTHER for an answer that is not a known choice, or
+    BLANK when it is missing. Every question gets `width` code slots so
+    a whole cohort's codes fit one (attempts x questions) int16 matrix.
+    """
+    assessment_id: int
+    passing_score: Optional[int]
+    question_ids: np.ndarray
+    labels: List[List[str]]
+    lookups: List[Dict[str, int]]
+    correct: np.ndarray
+    width: int
+
+    @property
+    def other(self) -> int:
+        return self.width - 2
+
+    @property
+    def blank(self) -> int:
+        return self.width - 1
+
+def compile_answer_key(assessment: Assessment,
+                       questions: Sequence[AssessmentQuestion]) -> AnswerKey:
+    questions = sorted(questions, key=lambda q: q.id)
+    labels, lookups, correct = [], [], []
+    for question in questions:
+        choices = [str(option) for option in (question.options or [])]
+        if question.correct_answer is not None and normalize_answer(question.correct_answer) not in {
+            normalize_answer(c) for c in choices
+        }:
+            # Free-response and true/false questions may have no option list
+            choices.append(str(question.correct_answer))
+        lookup = {}
+        for code, choice in enumerate(choices):
+            lookup.setdefault(normalize_answer(choice), code)
+        labels.append(choices)
+        lookups.append(lookup)
+        correct.append(
+            lookup[normalize_answer(question.correct_answer)]
+            if question.correct_answer is not None else -1
+        )
+    width = max((len(choices) for choices in labels), default=0) + 2
+    return AnswerKey(
+        assessment_id=assessment.id,
+        passing_score=assessment.passing_score,
+        question_ids=np.array([q.id for q in questions], dtype=np.int64),
+        labels=labels,
+        lookups=lookups,
+        correct=np.array(correct, dtype=np.int16),
+        width=width
+    )
+
+def encode_answers(key: AnswerKey, answer_sets: Sequence[Optional[dict]]) -> np.ndarray:
+    """(attempts x questions) matrix of answer codes"""
+    question_keys = [str(qid) for qid in key.question_ids.tolist()]
+    other, blank = key.other, key.blank
+    columns = []
+    for question_key, lookup in zip(question_keys, key.lookups):
+        get = lookup.get
+        column = []
+        append = column.append
+        for answers in answer_sets:
+            value = answers.get(question_key) if answers else None
+            append(blank if value is None else get(normalize_answer(value), other))
+        columns.append(np.array(column, dtype=np.int16))
+    if not columns:
+        return np.empty((len(answer_sets), 0), dtype=np.int16)
+    return np.stack(columns, axis=1)
+
+def score_codes(key: AnswerKey, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Percentage scores and pass flags for a batch of encoded attempts"""
+    if codes.shape[1] == 0:
+        scores = np.zeros(codes.shape[0])
+    else:
+        scores = (codes == key.correct).sum(axis=1) * (100.0 / codes.shape[1])
+    passed = scores >= key.passing_score if key.passing_score is not None else np.ones(len(scores), dtype=bool)
+    return scores, passed
+
+def item_statistics(key: AnswerKey, codes: np.ndarray) -> List[dict]:
+    """Difficulty, discrimination and answer frequencies for every question
+
+    Difficulty is the share of attempts answering correctly. Discrimination
+    is the corrected point-biserial correlation between getting the item
+    right and the score on the remaining items.
+    """
+    attempts, questions = codes.shape
+    if not attempts or not questions:
+        return []
+    correct = (codes == key.correct).astype(np.float64)
+    difficulty = correct.mean(axis=0)
+    rest = correct.sum(axis=1)[:, None] - correct
+    item_dev = correct - difficulty
+    rest_dev = rest - rest.mean(axis=0)
+    covariance = (item_dev * rest_dev).sum(axis=0)
+    spread = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+    discrimination = np.divide(covariance, spread, out=np.zeros(questions), where=spread > 0)
+
+    # One bincount over all questions: question j owns codes [j*width, (j+1)*width)
+    offsets = np.arange(questions, dtype=np.int64) * key.width
+    counts = np.bincount(
+        (codes.astype(np.int64) + offsets).ravel(), minlength=questions * key.width
+    ).reshape(questions, key.width)
+
+    stats = []
+    for j in range(questions):
+        stats.append({
+            "questionId": int(key.question_ids[j]),
+            "difficulty": round(float(difficulty[j]), 4),
+            "discrimination": round(float(discrimination[j]), 4),
+            "options": [
+                {
+                    "answer": label,
+                    "count": int(counts[j, code]),
+                    "share": round(float(counts[j, code]) / attempts, 4),
+                    "correct": bool(code == key.correct[j])
+                }
+                for code, label in enumerate(key.labels[j])
+            ],
+            "other": int(counts[j, key.other]),
+            "blank": int(counts[j, key.blank])
+        })
+    return stats
+
+answer_key_cache = TTLCache(max_entries=1024, ttl=3600.0)
+
+cache_sync.register("grading:answer_key", answer_key_cache.discard)
+
+async def get_answer_key(db: AsyncSession, assessment_id: int) -> Optional[AnswerKey]:
+    key = answer_key_cache.get(assessment_id)
+    if key is not None:
+        return key
+    assessment = await db.get(Assessment, assessment_id)
+    if assessment is None:
+        return None
+    questions = (await db.scalars(
+        select(AssessmentQuestion).where(AssessmentQuestion.assessment_id == assessment_id)
+    )).all()
+    key = compile_answer_key(assessment, questions)
+    answer_key_cache.set(assessment_id, key)
+    return key
+
+async def grade_attempts(db: AsyncSession, assessment_id: int, regrade: bool = False,
+                         batch_size: int = GRADE_BATCH) -> int:
+    """Score completed attempts in batches; only ungraded ones unless regrade
+
+    Returns the number of attempts graded, or -1 if the assessment does
+    not exist.
+    """
+    key = await get_answer_key(db, assessment_id)
+    if key is None:
+        return -1
+    query = select(AssessmentAttempt.id, AssessmentAttempt.answers).where(
+        AssessmentAttempt.assessment_id == assessment_id,
+        AssessmentAttempt.completed.is_(True)
+    )
+    if not regrade:
+        query = query.where(AssessmentAttempt.score.is_(None))
+    # Collect first: the UPDATEs cannot share the connection with an open cursor
+    rows = (await db.execute(query.order_by(AssessmentAttempt.id))).all()
+
+    table = AssessmentAttempt.__table__
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        codes = await asyncio.to_thread(encode_answers, key, [answers for _, answers in batch])
+        scores, _ = score_codes(key, codes)
+        await db.execute(
+            table.update()
+            .where(table.c.id == bindparam("attempt_id"))
+            .values(score=bindparam("new_score")),
+            [
+                {"attempt_id": attempt_id, "new_score": float(score)}
+                for (attempt_id, _), score in zip(batch, scores.tolist())
+            ]
+        )
+    await db.commit()
+    return len(rows)
+
+async def assessment_item_statistics(db: AsyncSession, assessment_id: int) -> Optional[dict]:
+    key = await get_answer_key(db, assessment_id)
+    if key is None:
+        return None
+    result = await db.stream_scalars(
+        select(AssessmentAttempt.answers)
+        .where(
+            AssessmentAttempt.assessment_id == assessment_id,
+            AssessmentAttempt.completed.is_(True)
+        )
+        .execution_options(yield_per=GRADE_BATCH)
+    )
+    answer_sets = [answers async for answers in result]
+
+    def compute():
+        codes = encode_answers(key, answer_sets)
+        scores, passed = score_codes(key, codes)
+        return {
+            "attempts": len(answer_sets),
+            "meanScore": round(float(scores.mean()), 2) if len(scores) else None,
+            "passRate": round(float(passed.mean()), 4) if len(passed) else None,
+            "items": item_statistics(key, codes)
+        }
+
+    return await asyncio.to_thread(compute)
+
+# Discarded after commit on every worker; at flush time a concurrent
+# grader could recompile the key from the old questions and cache it
+def _on_question_change(mapper, connection, target: AssessmentQuestion):
+    cache_sync.on_commit(target, "grading:answer_key", target.assessment_id)
+
+def _on_assessment_change(mapper, connection, target: Assessment):
+    cache_sync.on_commit(target, "grading:answer_key", target.id)
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(AssessmentQuestion, _event_name, _on_question_change)
+event.listen(Assessment, "after_update", _on_assessment_change)
+event.listen(Assessment, "after_delete", _on_assessment_change)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import event, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import AsyncSessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[AsyncSession, dict], Awaitable[None]]
+_handlers: Dict[str, JobHandler] = {}
+
+def job_handler(kind: str):
+    """Register the coroutine that runs jobs of this kind
+
+    Handlers get their own session and the job payload and should not
+    commit; the worker commits their changes together with the job status.
+    They must be safe to run more than once, since a job is retried if the
+    worker dies mid-run.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+async def enqueue(db: AsyncSession, kind: str, payload: dict, idempotency_key: str,
+                  max_attempts: int = 5, run_after: Optional[datetime] = None) -> bool:
+    """Add a job inside the caller's transaction (transactional outbox)
+
+    Returns False when a job with the same idempotency key already exists.
+    The job becomes visible to workers when the caller commits.
+    """
+    try:
+        async with db.begin_nested():
+            db.add(Job(
+                kind=kind,
+                payload=payload,
+                idempotency_key=idempotency_key,
+                max_attempts=max_attempts,
+                run_after=run_after or datetime.utcnow()
+            ))
+    except IntegrityError:
+        return False
+    # Wake the dispatcher once the job is committed rather than polling for it
+    event.listen(db.sync_session, "after_commit", lambda session: job_pool.notify(), once=True)
+    return True
+
+class JobWorkerPool:
+    """Claims due jobs from the jobs table and runs them on a pool of workers"""
+
+    def __init__(self, session_factory=AsyncSessionLocal, concurrency: int = 4,
+                 poll_interval: float = 1.0, batch_size: int = 20,
+                 lease_seconds: float = 300.0, retry_base_seconds: float = 2.0):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 2)
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def notify(self):
+        self._wakeup.set()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._dispatch())]
+        self._tasks += [loop.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _reclaim_expired(self, db: AsyncSession):
+        # Jobs whose worker died mid-run go back to the queue
+        await db.execute(
+            update(Job)
+            .where(
+                Job.status == 'running',
+                Job.locked_at < datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+            )
+            .values(status='pending', locked_at=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _claim(self, db: AsyncSession):
+        now = datetime.utcnow()
+        candidates = (await db.execute(
+            select(Job.id, Job.run_after)
+            .where(Job.status == 'pending', Job.run_after <= now)
+            .order_by(Job.run_after, Job.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )).all()
+        claimed = []
+        for job_id, run_after in candidates:
+            # Conditional update keeps claims exclusive on databases
+            # without SKIP LOCKED
+            result = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == 'pending')
+                .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append((job_id, run_after))
+        await db.commit()
+        return claimed, now
+
+    async def _dispatch(self):
+        last_reclaim = 0.0
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    if time.monotonic() - last_reclaim > self.lease_seconds / 2:
+                        await self._reclaim_expired(db)
+                        last_reclaim = time.monotonic()
+                    claimed, claimed_at = await self._claim(db)
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                claimed, claimed_at = [], None
+
+            for job_id, run_after in claimed:
+                lag = (claimed_at - run_after).total_seconds()
+                self.last_lag_seconds = lag
+                self.max_lag_seconds = max(self.max_lag_seconds, lag)
+                await self._queue.put(job_id)
+
+            if len(claimed) < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            start = time.perf_counter()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Recording the outcome of job %s failed", job_id)
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+
+    async def _run(self, job_id: int):
+        async with self.session_factory() as db:
+            job = await db.get(Job, job_id)
+            handler = _handlers.get(job.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"No handler registered for job kind {job.kind!r}")
+                await handler(db, job.payload)
+                # Marked done in the handler's own transaction, so its work
+                # and the job's completion commit together
+                job.status = 'done'
+                job.finished_at = datetime.utcnow()
+                job.locked_at = None
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                job = await db.get(Job, job_id)
+                job.last_error = repr(exc)
+                job.locked_at = None
+                if job.attempts >= job.max_attempts:
+                    job.status = 'failed'
+                    job.finished_at = datetime.utcnow()
+                    self.failed += 1
+                    logger.error("Job %s (%s) failed permanently: %r", job_id, job.kind, exc)
+                else:
+                    backoff = self.retry_base_seconds * 2 ** (job.attempts - 1)
+                    job.status = 'pending'
+                    job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+                    self.retried += 1
+                await db.commit()
+                return
+            self.processed += 1
+
+    async def stats(self, db: AsyncSession) -> dict:
+        counts = dict((await db.execute(
+            select(Job.status, func.count()).group_by(Job.status)
+        )).all())
+        oldest_due = await db.scalar(
+            select(func.min(Job.run_after))
+            .where(Job.status == 'pending', Job.run_after <= datetime.utcnow())
+        )
+        return {
+            "pending": counts.get('pending', 0),
+            "running": counts.get('running', 0),
+            "done": counts.get('done', 0),
+            "failed": counts.get('failed', 0),
+            "oldestDueLagSeconds": (
+                (datetime.utcnow() - oldest_due).total_seconds() if oldest_due else 0.0
+            ),
+            "processed": self.processed,
+            "retried": self.retried,
+            "permanentlyFailed": self.failed,
+            "lastClaimLagSeconds": self.last_lag_seconds,
+            "maxClaimLagSeconds": self.max_lag_seconds,
+            "busySeconds": round(self.busy_seconds, 3),
+            "localQueueDepth": self._queue.qsize()
+        }
+
+job_pool = JobWorkerPool()
@@ -0,0 +1,127 @@
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import Column, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.job import KeyRotation
+from app.security.data_protection import DataProtection
+from app.services.job_queue import enqueue, job_handler
+
+logger = logging.getLogger(__name__)
+
+ROTATION_JOB = "rotate_encrypted_column"
+ROTATION_CHUNK = 5000
+
+# Columns holding DataProtection tokens, keyed "table.column"
+ENCRYPTED_COLUMNS: Dict[str, Column] = {}
+
+_data_protection: Optional[DataProtection] = None
+
+def register_encrypted_column(column: Column) -> Column:
+    """Make a column eligible for key rotation, e.g. register_encrypted_column(User.__table__.c.phone)"""
+    ENCRYPTED_COLUMNS[f"{column.table.name}.{column.name}"] = column
+    return column
+
+def _protection() -> DataProtection:
+    global _data_protection
+    if _data_protection is None:
+        _data_protection = DataProtection()
+    return _data_protection
+
+async def _queue_chunk(db: AsyncSession, rotation: KeyRotation, suffix: str = ""):
+    await enqueue(
+        db, ROTATION_JOB,
+        {"rotation_id": rotation.id, "after_id": rotation.last_id},
+        idempotency_key=f"{ROTATION_JOB}:{rotation.id}:{rotation.last_id}{suffix}"
+    )
+
+async def start_rotation(db: AsyncSession, column_name: str) -> KeyRotation:
+    """Re-encrypt every value of a registered column under the primary key
+
+    Runs on the job workers one chunk at a time, so the table stays online:
+    old and new tokens are both readable while it is in progress.
+    """
+    if column_name not in ENCRYPTED_COLUMNS:
+        raise KeyError(column_name)
+    rotation = KeyRotation(column_name=column_name)
+    db.add(rotation)
+    await db.flush()
+    await _queue_chunk(db, rotation)
+    await db.commit()
+    return rotation
+
+async def resume_rotation(db: AsyncSession, rotation_id: int) -> Optional[KeyRotation]:
+    """Continue a rotation from its checkpoint, e.g. after its job gave up"""
+    rotation = await db.get(KeyRotation, rotation_id)
+    if rotation is None or rotation.status == 'done':
+        return rotation
+    rotation.status = 'running'
+    await _queue_chunk(db, rotation, suffix=f":resumed:{datetime.utcnow().timestamp()}")
+    await db.commit()
+    return rotation
+
+@job_handler(ROTATION_JOB)
+async def rotate_chunk(db: AsyncSession, payload: dict):
+    rotation = await db.get(KeyRotation, payload["rotation_id"])
+    # A chunk that was already checkpointed is a stale duplicate
+    if rotation is None or rotation.status != 'running' or rotation.last_id != payload["after_id"]:
+        return
+    column = ENCRYPTED_COLUMNS[rotation.column_name]
+    table = column.table
+
+    rows = (await db.execute(
+        select(table.c.id, column)
+        .where(table.c.id > rotation.last_id, column.is_not(None))
+        .order_by(table.c.id)
+        .limit(ROTATION_CHUNK)
+    )).all()
+    now = datetime.utcnow()
+    if not rows:
+        rotation.status = 'done'
+        rotation.updated_at = rotation.finished_at = now
+        logger.info("Rotated %s: %d rows at %.0f rows/s",
+                    rotation.column_name, rotation.rows_done, rotation.rows_per_second)
+        return
+
+    tokens = await _protection().rotate_many([value for _, value in rows], skip_invalid=True)
+    failed = [row_id for (row_id, _), token in zip(rows, tokens) if token is None]
+    if failed:
+        # Left as they are; one corrupt value must not stall the rotation
+        logger.warning("Rotating %s: %d values no key can decrypt, ids %s",
+                       rotation.column_name, len(failed), failed)
+    params = [
+        {"rotation_row_id": row_id, "rotation_old_value": value, "rotation_value": token}
+        for (row_id, value), token in zip(rows, tokens)
+        if token is not None
+    ]
+    if params:
+        # Only rewrite values nobody changed since the read. A row that was
+        # written meanwhile is skipped: new writes already use the primary key
+        await db.execute(
+            table.update()
+            .where(
+                table.c.id == bindparam("rotation_row_id"),
+                column == bindparam("rotation_old_value")
+            )
+            .values({column.name: bindparam("rotation_value")}),
+            params
+        )
+    # The checkpoint commits with the rewritten rows, so a crash resumes here
+    rotation.last_id = rows[-1][0]
+    rotation.rows_done += len(params)
+    rotation.rows_failed = (rotation.rows_failed or 0) + len(failed)
+    rotation.updated_at = now
+    await _queue_chunk(db, rotation)
+
+def rotation_status(rotation: KeyRotation) -> dict:
+    return {
+        "id": rotation.id,
+        "column": rotation.column_name,
+        "status": rotation.status,
+        "lastId": rotation.last_id,
+        "rowsDone": rotation.rows_done,
+        "rowsFailed": rotation.rows_failed,
+        "rowsPerSecond": rotation.rows_per_second,
+        "startedAt": rotation.started_at,
+        "finishedAt": rotation.finished_at
+    }
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import smtplib
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import List, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SMTPPool:
+    """A small pool of open SMTP sessions for sending mail in batches
+
+    smtplib is blocking, so each batch runs on a worker thread over one
+    checked-out connection: connect, EHLO, STARTTLS and AUTH happen once
+    per connection instead of once per message. Idle connections are
+    probed with NOOP before reuse. Any SMTP server works, including a
+    local stub such as `python -m aiosmtpd -n -l localhost:1025`.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 25,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = False, size: int = 4, timeout: float = 30.0,
+                 max_idle: float = 60.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: deque = deque()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.batches = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def _usable(self, conn: smtplib.SMTP, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.max_idle:
+            return True
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+
+    def _deliver(self, conn: Optional[smtplib.SMTP], idle_since: float,
+                 messages: List[EmailMessage]):
+        if conn is not None and not self._usable(conn, idle_since):
+            self._close(conn)
+            conn = None
+        reused = conn is not None
+        sent = 0
+        try:
+            if conn is None:
+                conn = self._connect()
+            for message in messages:
+                try:
+                    conn.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    # The server may drop a pooled connection at any time;
+                    # reconnect once per batch and resend this message
+                    if not reused:
+                        raise
+                    reused = False
+                    conn = self._connect()
+                    conn.send_message(message)
+                except smtplib.SMTPRecipientsRefused:
+                    # Permanent for this recipient; retrying will not help
+                    logger.warning("Recipient refused for %r", message["To"])
+                sent += 1
+        except Exception as exc:
+            if conn is not None:
+                conn.close()
+            return sent, None, exc
+        return sent, conn, None
+
+    async def send_many(self, messages: List[EmailMessage]) -> Tuple[int, Optional[Exception]]:
+        """Send messages in order over one pooled connection
+
+        Returns how many went out and the error that stopped the batch, if
+        any, so the caller can retry only the remainder.
+        """
+        if not messages:
+            return 0, None
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            idle_since, conn = self._idle.pop() if self._idle else (0.0, None)
+            sent, conn, error = await asyncio.to_thread(self._deliver, conn, idle_since, messages)
+            if conn is not None:
+                self._idle.append((time.monotonic(), conn))
+        self.batches += 1
+        self.messages_sent += sent
+        return sent, error
+
+    def close(self):
+        while self._idle:
+            _, conn = self._idle.pop()
+            self._close(conn)
+
+    def stats(self) -> dict:
+        return {
+            "connectionsOpened": self.connections_opened,
+            "idleConnections": len(self._idle),
+            "messagesSent": self.messages_sent,
+            "batches": self.batches
+        }
+
+def build_message(to: str, subject: str, body: str,
+                  sender: Optional[str] = None) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = sender or getattr(settings, "EMAIL_FROM", "no-reply@localhost")
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    return message
+
+smtp_pool = SMTPPool(
+    host=getattr(settings, "SMTP_HOST", "localhost"),
+    port=getattr(settings, "SMTP_PORT", 25),
+    username=getattr(settings, "SMTP_USERNAME", None),
+    password=getattr(settings, "SMTP_PASSWORD", None),
+    starttls=getattr(settings, "SMTP_STARTTLS", False),
+    size=getattr(settings, "SMTP_POOL_SIZE", 4)
+)
@@ -0,0 +1,279 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the shape Prometheus client libraries use by default
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# The same SELECT run this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Counter:
+    """Monotonic counter with optional labels
+
+    Updates are plain dict arithmetic without a lock: everything that
+    records metrics runs on the event loop thread, and a rare lost
+    increment from a worker thread is acceptable for monitoring.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Counts are stored per bucket and accumulated only when scraped
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in list(self._series.items()):
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                running += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {running}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {running}"
+
+class Gauge:
+    """Gauge read from a callback at scrape time, so the hot path pays nothing
+
+    The callback returns a number, or a mapping of label tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        try:
+            value = self.read()
+        except Exception:
+            logger.exception("Reading gauge %s failed", self.name)
+            return
+        if value is None:
+            return
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for labels, number in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(number)}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        # Re-registering (e.g. on reload) replaces the previous collector
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, read, labels))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    labels=("method", "route", "status")
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Time spent executing individual SQL statements"
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request",
+    labels=("route",), buckets=QUERY_COUNT_BUCKETS
+)
+db_time_per_request = registry.histogram(
+    "db_time_per_request_seconds", "Total SQL time per HTTP request", labels=("route",)
+)
+db_n_plus_one = registry.counter(
+    "db_n_plus_one_total", "Requests that repeated one SELECT at least "
+    f"{N_PLUS_ONE_THRESHOLD} times", labels=("route",)
+)
+
+class RequestStats:
+    __slots__ = ("queries", "query_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements: Dict[str, int] = {}
+
+# Set by MetricsMiddleware for the duration of each HTTP request
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    db_query_duration.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+        # Identical text with different parameters is the N+1 signature
+        if not executemany:
+            stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+def _on_error(exception_context):
+    # Failed statements never reach after_cursor_execute
+    conn = exception_context.connection
+    started = conn.info.get("metrics_started") if conn is not None else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """Time and count every statement run through engine (sync or async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _on_error)
+
+def pool_stats(engine) -> Optional[dict]:
+    """Pool occupancy as {(state,): connections}; None for pools without sizing"""
+    pool = getattr(engine, "sync_engine", engine).pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    stats = {("checked_out",): pool.checkedout()}
+    for state, reader in (("idle", "checkedin"), ("overflow", "overflow"), ("size", "size")):
+        if hasattr(pool, reader):
+            stats[(state,)] = getattr(pool, reader)()
+    return stats
+
+def _route_template(scope) -> str:
+    # FastAPI records the matched route; fall back to matching ourselves
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    app = scope.get("app")
+    if app is not None:
+        from starlette.routing import Match
+        for candidate in app.router.routes:
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                return getattr(candidate, "path", "unmatched")
+    return "unmatched"
+
+def _report_n_plus_one(route: str, stats: RequestStats):
+    for statement, count in stats.statements.items():
+        if count >= N_PLUS_ONE_THRESHOLD and statement.lstrip()[:6].upper() == "SELECT":
+            db_n_plus_one.inc(route)
+            logger.warning(
+                "Possible N+1 on %s: statement ran %d times in one request: %.200s",
+                route, count, " ".join(statement.split())
+            )
+            return
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route template
+
+    Plain ASGI rather than BaseHTTPMiddleware, which would add a task and
+    a body copy to every request. Add it with app.add_middleware().
+    """
+
+    def __init__(self, app, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = frozenset(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = _route_template(scope)
+            http_request_duration.observe(elapsed, scope["method"], route, f"{status // 100}xx")
+            db_queries_per_request.observe(stats.queries, route)
+            if stats.queries:
+                db_time_per_request.observe(stats.query_time, route)
+                if stats.queries >= N_PLUS_ONE_THRESHOLD:
+                    _report_n_plus_one(route, stats)
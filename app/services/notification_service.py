@@ -1,7 +1,23 @@
 from enum import Enum
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import Base
+from app.models.course import Enrollment
+from app.models.event import EventRegistration
+from app.services.cache_sync import cache_sync
+from app.services.job_queue import enqueue, job_handler
+from app.services.mailer import build_message, smtp_pool
+from app.services.metrics import registry
+from app.utils.cache import TTLCache
+from app.utils.pagination import keyset_page
+
+logger = logging.getLogger(__name__)
 
 class NotificationType(Enum):
     COURSE_UPDATE = "course_update"
@@ -12,6 +28,10 @@ class NotificationType(Enum):
 
 class Notification(Base):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        Index('ix_notifications_user_coalesce', 'user_id', 'coalesce_key'),
+        Index('ix_notifications_user_read_created', 'user_id', 'read', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'))
@@ -20,33 +40,259 @@ class Notification(Base):
     message = Column(Text)
     read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Identical unread notifications share a key and are only stored once
+    coalesce_key = Column(String(64))
+    emailed_at = Column(DateTime, nullable=True)
+
+# Per-user unread count, adjusted in the same transaction as the rows
+class NotificationCounter(Base):
+    __tablename__ = 'notification_counters'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
+
+REALTIME_JOB = "notification_realtime"
+EMAIL_JOB = "notification_email"
+# Notifications per multi-row INSERT and per outbox job
+INSERT_CHUNK = 1000
+DELIVERY_CHUNK = 200
+EMAIL_RETRY_SECONDS = 30
+
+# Badge polls are answered from here; entries are dropped on every worker
+# once a change commits, and expire quickly in case a message is missed
+unread_cache = TTLCache(max_entries=100000, ttl=30.0)
+
+def _evict_unread(user_ids: List[int]):
+    for user_id in user_ids:
+        unread_cache.discard(user_id)
+
+cache_sync.register("notifications:unread", _evict_unread)
+
+notifications_created = registry.counter(
+    "notifications_created_total", "Notifications stored by send_bulk", labels=("type",)
+)
+send_bulk_duration = registry.histogram(
+    "notification_send_bulk_seconds", "Time to store and queue one bulk notification"
+)
+
+def coalesce_key_for(type, title, message) -> str:
+    raw = f"{type.value}\x00{title}\x00{message}"
+    return hashlib.sha256(raw.encode()).hexdigest()
 
 class NotificationService:
-    def __init__(self, db_session):
+    def __init__(self, db_session: AsyncSession):
         self.db = db_session
 
     async def send_notification(self, user_id, type, title, message):
-        notification = Notification(
-            user_id=user_id,
-            type=type,
-            title=title,
-            message=message
+        await self.send_bulk([user_id], type, title, message)
+
+    async def send_bulk(self, user_ids: Iterable[int], type, title, message,
+                        email: bool = True, commit: bool = True) -> int:
+        """Notify many users with multi-row inserts and queue their delivery
+
+        Users who already have the same notification unread are skipped.
+        Realtime pushes and emails are sent by the job workers once this
+        commits, in chunks, so the caller only pays for the inserts.
+        Returns the number of notifications created. Pass commit=False to
+        leave committing to the caller, e.g. from a job handler.
+        """
+        started = time.perf_counter()
+        key = coalesce_key_for(type, title, message)
+        pending = sorted(set(user_ids))
+        created = 0
+        for start in range(0, len(pending), INSERT_CHUNK):
+            chunk = pending[start:start + INSERT_CHUNK]
+            duplicates = set((await self.db.scalars(select(Notification.user_id).where(
+                Notification.user_id.in_(chunk),
+                Notification.coalesce_key == key,
+                Notification.read == False
+            ))).all())
+            rows = [
+                {
+                    "user_id": user_id,
+                    "type": type,
+                    "title": title,
+                    "message": message,
+                    "coalesce_key": key
+                }
+                for user_id in chunk if user_id not in duplicates
+            ]
+            if not rows:
+                continue
+            ids = (await self.db.scalars(
+                insert(Notification).returning(Notification.id), rows
+            )).all()
+            await self._adjust_unread([row["user_id"] for row in rows], 1)
+            await self._queue_delivery(sorted(ids), email)
+            created += len(ids)
+        if commit:
+            await self.db.commit()
+        send_bulk_duration.observe(time.perf_counter() - started)
+        notifications_created.inc(type.value, amount=created)
+        return created
+
+    async def notify_course_enrollees(self, course_id, type, title, message) -> int:
+        user_ids = (await self.db.scalars(
+            select(Enrollment.user_id).where(Enrollment.course_id == course_id)
+        )).all()
+        return await self.send_bulk(user_ids, type, title, message)
+
+    async def notify_event_attendees(self, event_id, type, title, message,
+                                     commit: bool = True) -> int:
+        user_ids = (await self.db.scalars(
+            select(EventRegistration.user_id).where(EventRegistration.event_id == event_id)
+        )).all()
+        return await self.send_bulk(user_ids, type, title, message, commit=commit)
+
+    async def _queue_delivery(self, ids: List[int], email: bool):
+        kinds = [REALTIME_JOB, EMAIL_JOB] if email else [REALTIME_JOB]
+        for start in range(0, len(ids), DELIVERY_CHUNK):
+            chunk = ids[start:start + DELIVERY_CHUNK]
+            for kind in kinds:
+                await enqueue(
+                    self.db, kind, {"ids": chunk},
+                    idempotency_key=f"{kind}:{chunk[0]}:{chunk[-1]}"
+                )
+
+    async def _seed_counters(self, user_ids: Sequence[int]) -> bool:
+        """Create counters from the notifications table; False on a seeding race"""
+        unread = dict((await self.db.execute(
+            select(Notification.user_id, func.count())
+            .where(Notification.user_id.in_(user_ids), Notification.read == False)
+            .group_by(Notification.user_id)
+        )).all())
+        try:
+            async with self.db.begin_nested():
+                await self.db.execute(insert(NotificationCounter), [
+                    {"user_id": user_id, "unread": unread.get(user_id, 0)}
+                    for user_id in user_ids
+                ])
+        except IntegrityError:
+            return False
+        return True
+
+    async def _adjust_unread(self, user_ids: Sequence[int], delta: int):
+        """Add delta to each user's unread counter inside the caller's transaction"""
+        if not user_ids or not delta:
+            return
+        await self.db.flush()
+        await self.db.execute(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id.in_(user_ids))
+            .values(unread=NotificationCounter.unread + delta)
+            .execution_options(synchronize_session=False)
         )
-        self.db.add(notification)
+        existing = set((await self.db.scalars(
+            select(NotificationCounter.user_id).where(NotificationCounter.user_id.in_(user_ids))
+        )).all())
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        # Seeding counts the flushed rows, so it already includes this delta
+        if missing and not await self._seed_counters(missing):
+            for user_id in missing:
+                if not await self._seed_counters([user_id]):
+                    await self._adjust_unread([user_id], delta)
+        # Evicting now would let a concurrent poll cache the old count again
+        cache_sync.on_commit(self.db.sync_session, "notifications:unread", list(user_ids))
+
+    async def unread_count(self, user_id: int) -> int:
+        cached = unread_cache.get(user_id)
+        if cached is not None:
+            return cached
+        unread = await self.db.scalar(
+            select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)
+        )
+        if unread is None:
+            await self._seed_counters([user_id])
+            await self.db.commit()
+            unread = await self.db.scalar(
+                select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)
+            )
+        unread_cache.set(user_id, unread)
+        return unread
+
+    async def list_inbox(self, user_id: int, cursor: Optional[str] = None,
+                         limit: int = 20, unread_only: bool = False) -> Tuple[list, Optional[str]]:
+        """Newest first, keyset-paged along ix_notifications_user_read_created"""
+        query = select(Notification).where(Notification.user_id == user_id)
+        if unread_only:
+            query = query.where(Notification.read == False)
+        return await keyset_page(
+            self.db, query, Notification.created_at, Notification.id,
+            cursor, limit, descending=True
+        )
+
+    async def mark_read(self, user_id: int, notification_ids: Optional[Sequence[int]] = None) -> int:
+        """Mark the given notifications, or all of them, read in one UPDATE"""
+        stmt = update(Notification).where(
+            Notification.user_id == user_id,
+            Notification.read == False
+        )
+        if notification_ids is not None:
+            if not notification_ids:
+                return 0
+            stmt = stmt.where(Notification.id.in_(notification_ids))
+        result = await self.db.execute(
+            stmt.values(read=True).execution_options(synchronize_session=False)
+        )
+        await self._adjust_unread([user_id], -result.rowcount)
         await self.db.commit()
-        
-        # Send real-time notification if user is online
-        await self.send_realtime_notification(user_id, notification)
-        
-        # Send email notification based on user preferences
-        await self.send_email_notification(user_id, notification)
+        return result.rowcount
 
     async def mark_as_read(self, notification_id, user_id):
-        notification = await self.db.query(Notification).filter(
-            Notification.id == notification_id,
-            Notification.user_id == user_id
-        ).first()
-        
-        if notification:
-            notification.read = True
-            await self.db.commit()
\ No newline at end of file
+        await self.mark_read(user_id, [notification_id])
+
+def serialize_notification(notification: Notification) -> dict:
+    return {
+        "type": "notification",
+        "id": notification.id,
+        "notificationType": notification.type.value,
+        "title": notification.title,
+        "message": notification.message,
+        "createdAt": notification.created_at.isoformat()
+    }
+
+@job_handler(REALTIME_JOB)
+async def push_notifications(db: AsyncSession, payload: dict):
+    # Imported here: the websocket routes own the connection manager
+    from app.routes.websocket import manager
+
+    notifications = (await db.scalars(
+        select(Notification).where(Notification.id.in_(payload["ids"]))
+    )).all()
+    for notification in notifications:
+        await manager.send_personal_message(
+            serialize_notification(notification), notification.user_id
+        )
+
+@job_handler(EMAIL_JOB)
+async def email_notifications(db: AsyncSession, payload: dict):
+    from app.models.user import User
+
+    rows = (await db.execute(
+        select(Notification.id, Notification.title, Notification.message, User.email)
+        .join(User, User.id == Notification.user_id)
+        .where(Notification.id.in_(payload["ids"]), Notification.emailed_at.is_(None))
+        .order_by(Notification.id)
+    )).all()
+    rows = [row for row in rows if row.email]
+    messages = [build_message(row.email, row.title, row.message) for row in rows]
+    sent, error = await smtp_pool.send_many(messages)
+    if error is not None and not sent:
+        raise error
+
+    if sent:
+        await db.execute(
+            update(Notification)
+            .where(Notification.id.in_([row.id for row in rows[:sent]]))
+            .values(emailed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    if error is not None:
+        # Keep what went out and retry only the rest, so nobody gets twice
+        logger.warning("Email batch stopped after %d of %d: %r", sent, len(rows), error)
+        remaining = [row.id for row in rows[sent:]]
+        await enqueue(
+            db, EMAIL_JOB, {"ids": remaining},
+            idempotency_key=f"{EMAIL_JOB}:{remaining[0]}:{remaining[-1]}",
+            run_after=datetime.utcnow() + timedelta(seconds=EMAIL_RETRY_SECONDS)
+        )
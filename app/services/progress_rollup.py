@@ -0,0 +1,57 @@
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.progress import CourseProgress, UserProgressSummary
+
+async def _seed_summary(db: AsyncSession, user_id: int) -> bool:
+    """Create a user's summary from course_progress; False if one already exists
+
+    Runs after the caller's changes are flushed, so the aggregate already
+    reflects them.
+    """
+    course_count, progress_total, completed_count = (await db.execute(
+        select(
+            func.count(CourseProgress.id),
+            func.coalesce(func.sum(CourseProgress.progress_percentage), 0.0),
+            func.coalesce(func.sum(case((CourseProgress.completed.is_(True), 1), else_=0)), 0)
+        ).where(CourseProgress.user_id == user_id)
+    )).one()
+    try:
+        async with db.begin_nested():
+            db.add(UserProgressSummary(
+                user_id=user_id,
+                course_count=course_count,
+                progress_total=progress_total,
+                completed_count=completed_count
+            ))
+    except IntegrityError:
+        return False
+    return True
+
+async def apply_progress_delta(db: AsyncSession, user_id: int, courses: int = 0,
+                               progress: float = 0.0, completed: int = 0):
+    """Adjust a user's rollup in place, inside the caller's transaction"""
+    if not (courses or progress or completed):
+        return
+    await db.flush()
+    result = await db.execute(
+        update(UserProgressSummary)
+        .where(UserProgressSummary.user_id == user_id)
+        .values(
+            course_count=UserProgressSummary.course_count + courses,
+            progress_total=UserProgressSummary.progress_total + progress,
+            completed_count=UserProgressSummary.completed_count + completed
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0 and not await _seed_summary(db, user_id):
+        # Someone else seeded it between our UPDATE and INSERT
+        await apply_progress_delta(db, user_id, courses, progress, completed)
+
+async def get_progress_summary(db: AsyncSession, user_id: int) -> UserProgressSummary:
+    summary = await db.get(UserProgressSummary, user_id)
+    if summary is None:
+        await _seed_summary(db, user_id)
+        await db.commit()
+        summary = await db.get(UserProgressSummary, user_id)
+    return summary
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func, select
+from app.models.resource import Resource, ResourceDownload, ResourceView
+
+try:
+    from scipy import sparse
+except ImportError:  # pragma: no cover - popularity-only fallback
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+VIEW_WEIGHT = 1.0
+DOWNLOAD_WEIGHT = 3.0
+
+class ResourceRecommender:
+    """Item-item co-occurrence recommender over resource views and downloads
+
+    build() turns (user, resource, weight) history into a sparse user x
+    item matrix and precomputes cosine similarity between items, keeping
+    only the top neighbors per item. Recommendations are cached per user
+    (LRU with TTL) and fall back to a precomputed popularity list. Without
+    SciPy installed only the popularity list is served.
+    """
+
+    def __init__(self, neighbors: int = 50, cache_size: int = 10000, cache_ttl: float = 900.0):
+        self.neighbors = neighbors
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._item_ids = np.empty(0, dtype=np.int64)
+        self._item_index: Dict[int, int] = {}
+        self._similarity = None
+        self._popular: List[int] = []
+        self._history: Dict[int, Dict[int, float]] = defaultdict(dict)
+        # Interactions recorded while a rebuild runs, replayed onto its result
+        self._journal: Optional[List[Tuple[int, int, float]]] = None
+        self._cache: "OrderedDict[int, Tuple[float, List[int]]]" = OrderedDict()
+        self._lock = Lock()
+        self.built_at: Optional[float] = None
+
+    def build(self, interactions: Iterable[Tuple[int, int, float]],
+              popular: Optional[List[int]] = None):
+        """Rebuild the similarity matrix from aggregated (user_id, resource_id, weight)"""
+        history: Dict[int, Dict[int, float]] = defaultdict(dict)
+        for user_id, resource_id, weight in interactions:
+            items = history[user_id]
+            items[resource_id] = items.get(resource_id, 0.0) + weight
+        if not history or sparse is None:
+            if sparse is None:
+                logger.warning("SciPy is not installed; recommending popular resources only")
+            if popular is None:
+                totals: Dict[int, float] = defaultdict(float)
+                for items in history.values():
+                    for resource_id, weight in items.items():
+                        totals[resource_id] += weight
+                popular = sorted(totals, key=lambda r: (-totals[r], r))[:100]
+            self._swap(history, np.empty(0, dtype=np.int64), None, popular)
+            return
+
+        users = np.fromiter(
+            (u for u, items in history.items() for _ in items), dtype=np.int64
+        )
+        resources = np.fromiter(
+            (r for items in history.values() for r in items), dtype=np.int64
+        )
+        weights = np.fromiter(
+            (w for items in history.values() for w in items.values()), dtype=np.float64
+        )
+        item_ids, item_cols = np.unique(resources, return_inverse=True)
+        _, user_rows = np.unique(users, return_inverse=True)
+
+        # Dampen heavy users so one binge does not dominate co-occurrence
+        matrix = sparse.csr_matrix(
+            (np.log1p(weights), (user_rows, item_cols)),
+            shape=(int(user_rows.max(initial=-1)) + 1, len(item_ids))
+        )
+        cooccurrence = (matrix.T @ matrix).tocsr()
+        norms = np.sqrt(cooccurrence.diagonal())
+        norms[norms == 0] = 1.0
+        inverse = sparse.diags(1.0 / norms)
+        similarity = (inverse @ cooccurrence @ inverse).tocsr()
+        similarity.setdiag(0)
+        similarity.eliminate_zeros()
+        similarity = self._prune(similarity)
+
+        if popular is None:
+            totals = np.asarray(matrix.sum(axis=0)).ravel()
+            popular = item_ids[np.argsort(-totals, kind="stable")][:100].tolist()
+
+        self._swap(history, item_ids, similarity, popular)
+
+    def begin_rebuild(self):
+        """Journal interactions from now on, until the next build() swaps in"""
+        with self._lock:
+            self._journal = []
+
+    def _swap(self, history, item_ids, similarity, popular):
+        with self._lock:
+            # Interactions recorded since begin_rebuild() may be missing from
+            # the snapshot; at worst one is counted twice until the next rebuild
+            for user_id, resource_id, weight in self._journal or ():
+                items = history[user_id]
+                items[resource_id] = items.get(resource_id, 0.0) + weight
+            self._journal = None
+            self._item_ids = item_ids
+            self._item_index = {int(r): i for i, r in enumerate(item_ids)}
+            self._similarity = similarity
+            self._popular = list(popular)
+            self._history = history
+            self._cache.clear()
+            self.built_at = time.time()
+
+    def _prune(self, similarity: "sparse.csr_matrix") -> "sparse.csr_matrix":
+        """Keep only the strongest `neighbors` entries in every row"""
+        rows, cols, data = [], [], []
+        for row in range(similarity.shape[0]):
+            start, end = similarity.indptr[row], similarity.indptr[row + 1]
+            if start == end:
+                continue
+            row_data = similarity.data[start:end]
+            row_cols = similarity.indices[start:end]
+            if len(row_data) > self.neighbors:
+                keep = np.argpartition(-row_data, self.neighbors)[:self.neighbors]
+                row_data, row_cols = row_data[keep], row_cols[keep]
+            rows.append(np.full(len(row_data), row))
+            cols.append(row_cols)
+            data.append(row_data)
+        if not data:
+            return sparse.csr_matrix(similarity.shape)
+        return sparse.csr_matrix(
+            (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+            shape=similarity.shape
+        )
+
+    def record(self, user_id: int, resource_id: int, weight: float):
+        """Fold a new interaction into the user's history between rebuilds"""
+        with self._lock:
+            items = self._history[user_id]
+            items[resource_id] = items.get(resource_id, 0.0) + weight
+            if self._journal is not None:
+                self._journal.append((user_id, resource_id, weight))
+            self._cache.pop(user_id, None)
+
+    def _compute(self, user_id: int, k: int) -> List[int]:
+        history = self._history.get(user_id, {})
+        seen = set(history)
+        known = [(self._item_index[r], w) for r, w in history.items() if r in self._item_index]
+        picks: List[int] = []
+        if known:
+            rows = np.array([i for i, _ in known])
+            weights = np.log1p(np.array([w for _, w in known]))
+            scores = np.asarray(self._similarity[rows].T @ weights).ravel()
+            scores[rows] = 0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates):
+                top = candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+                picks = [int(r) for r in self._item_ids[top]]
+        for resource_id in self._popular:
+            if len(picks) >= k:
+                break
+            if resource_id not in seen and resource_id not in picks:
+                picks.append(resource_id)
+        return picks
+
+    def recommend(self, user_id: int, k: int = 5) -> List[int]:
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[0] > time.monotonic() and len(entry[1]) >= k:
+                self._cache.move_to_end(user_id)
+                return entry[1][:k]
+            picks = self._compute(user_id, k)
+            self._cache[user_id] = (time.monotonic() + self.cache_ttl, picks)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return picks
+
+    def popular(self, k: int = 5) -> List[int]:
+        return self._popular[:k]
+
+recommender = ResourceRecommender()
+
+async def load_interactions(db) -> List[Tuple[int, int, float]]:
+    """Per (user, resource) view and download counts, aggregated in SQL"""
+    interactions = []
+    for model, weight in ((ResourceView, VIEW_WEIGHT), (ResourceDownload, DOWNLOAD_WEIGHT)):
+        result = await db.stream(
+            select(model.user_id, model.resource_id, func.count())
+            .where(model.user_id.is_not(None))
+            .group_by(model.user_id, model.resource_id)
+            .execution_options(yield_per=10000)
+        )
+        async for user_id, resource_id, count in result:
+            interactions.append((user_id, resource_id, count * weight))
+    return interactions
+
+async def rebuild_recommendations(db):
+    # Before reading, so nothing recorded during the rebuild is lost
+    recommender.begin_rebuild()
+    # Without SciPy only the popularity list is served; skip the history scan
+    interactions = await load_interactions(db) if sparse is not None else []
+    popular = (await db.scalars(
+        select(Resource.id).order_by(Resource.download_count.desc()).limit(100)
+    )).all()
+    start = time.perf_counter()
+    # The matrix work is NumPy/SciPy and releases the GIL for the heavy parts
+    await asyncio.to_thread(recommender.build, interactions, list(popular))
+    logger.info("Rebuilt recommendations from %d interactions in %.2fs",
+                len(interactions), time.perf_counter() - start)
+
+async def run_periodic_rebuild(session_factory, interval: float = 3600.0):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as db:
+                await rebuild_recommendations(db)
+        except Exception:
+            logger.exception("Rebuilding recommendations failed")
+
+_rebuild_task: Optional[asyncio.Task] = None
+
+def start_periodic_rebuild(session_factory, interval: float = 3600.0):
+    global _rebuild_task
+    if _rebuild_task is None or _rebuild_task.done():
+        _rebuild_task = asyncio.get_running_loop().create_task(
+            run_periodic_rebuild(session_factory, interval)
+        )
+
+async def stop_periodic_rebuild():
+    global _rebuild_task
+    if _rebuild_task is not None:
+        _rebuild_task.cancel()
+        await asyncio.gather(_rebuild_task, return_exceptions=True)
+        _rebuild_task = None
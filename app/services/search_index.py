@@ -0,0 +1,219 @@
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from threading import RLock
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import event, select
+from app.models.course import Course
+from app.models.resource import Resource
+from app.services.cache_sync import cache_sync
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "the", "to", "with"
+})
+
+# Searches sorted by a column rather than relevance filter in SQL on the
+# best hits' ids; this caps the size of that IN list
+SORTED_SEARCH_LIMIT = 1000
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+class SearchIndex:
+    """In-process inverted index with BM25 ranking, prefix matching and facets"""
+
+    def __init__(self, facet_fields: Sequence[str], k1: float = 1.2, b: float = 0.75,
+                 min_prefix_length: int = 2):
+        self.facet_fields = tuple(facet_fields)
+        self.k1 = k1
+        self.b = b
+        self.min_prefix_length = min_prefix_length
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._vocabulary: List[str] = []
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_facets: Dict[int, Dict[str, Optional[str]]] = {}
+        self._total_length = 0
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: int, text: str, facets: Dict[str, Optional[str]]):
+        """Index a document, replacing any previous version of it"""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self.remove(doc_id)
+            for term, tf in terms.items():
+                postings = self._postings[term]
+                if not postings:
+                    insort(self._vocabulary, term)
+                postings[doc_id] = tf
+            length = sum(terms.values())
+            self._doc_lengths[doc_id] = length
+            self._doc_terms[doc_id] = tuple(terms)
+            self._doc_facets[doc_id] = {f: facets.get(f) for f in self.facet_fields}
+            self._total_length += length
+
+    def remove(self, doc_id: int):
+        with self._lock:
+            if doc_id not in self._doc_lengths:
+                return
+            for term in self._doc_terms.pop(doc_id):
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary.pop(bisect_left(self._vocabulary, term))
+            self._total_length -= self._doc_lengths.pop(doc_id)
+            del self._doc_facets[doc_id]
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocabulary.clear()
+            self._doc_lengths.clear()
+            self._doc_terms.clear()
+            self._doc_facets.clear()
+            self._total_length = 0
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """Every vocabulary term starting with prefix, for type-ahead
+
+        Prefixes shorter than min_prefix_length only match themselves, so a
+        single typed letter cannot expand to most of the vocabulary.
+        """
+        if len(prefix) < self.min_prefix_length:
+            return [prefix] if prefix in self._postings else []
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def _matches_filters(self, doc_id: int, filters: Dict[str, Optional[str]]) -> bool:
+        facets = self._doc_facets[doc_id]
+        return all(facets.get(f) == v for f, v in filters.items() if v is not None)
+
+    def _score(self, terms: Iterable[str], doc_ids: Set[int]) -> Dict[int, float]:
+        """BM25 scores for doc_ids only; common terms have long posting lists"""
+        n = len(self._doc_lengths)
+        avg_length = (self._total_length / n) if n else 0.0
+        scores: Dict[int, float] = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            if len(doc_ids) < len(postings):
+                matches = ((d, postings[d]) for d in doc_ids if d in postings)
+            else:
+                matches = ((d, tf) for d, tf in postings.items() if d in doc_ids)
+            for doc_id, tf in matches:
+                norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / (avg_length or 1)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def search(self, query: str, filters: Optional[Dict[str, Optional[str]]] = None,
+               prefix: bool = True) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs ordered by BM25 relevance
+
+        Every query term must match; when prefix is set the last term also
+        matches any indexed term it is a prefix of.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        filters = filters or {}
+        with self._lock:
+            term_groups = [[t] for t in terms]
+            if prefix:
+                term_groups[-1] = self.expand_prefix(terms[-1]) or [terms[-1]]
+
+            candidates = None
+            for group in term_groups:
+                docs = set()
+                for term in group:
+                    docs.update(self._postings.get(term, ()))
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    return []
+
+            candidates = {d for d in candidates if self._matches_filters(d, filters)}
+            scores = self._score((t for group in term_groups for t in group), candidates)
+            ranked = [(doc_id, scores[doc_id]) for doc_id in candidates]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+    def facet_counts(self, doc_ids: Optional[Iterable[int]] = None) -> Dict[str, Dict[str, int]]:
+        """Count facet values over doc_ids, or over the whole index"""
+        with self._lock:
+            if doc_ids is None:
+                doc_ids = list(self._doc_facets)
+            counts = {f: Counter() for f in self.facet_fields}
+            for doc_id in doc_ids:
+                for field, value in self._doc_facets[doc_id].items():
+                    if value is not None:
+                        counts[field][value] += 1
+        return {f: dict(c.most_common()) for f, c in counts.items()}
+
+resource_index = SearchIndex(facet_fields=("category", "type"))
+course_index = SearchIndex(facet_fields=("category", "level"))
+
+def _resource_document(resource: Resource):
+    return (
+        resource.id,
+        f"{resource.title} {resource.description or ''}",
+        {"category": resource.category, "type": resource.type}
+    )
+
+def _course_document(course: Course):
+    return (
+        course.id,
+        f"{course.title} {course.description or ''}",
+        {"category": course.category, "level": course.level}
+    )
+
+def index_resource(resource: Resource):
+    resource_index.add(*_resource_document(resource))
+
+def index_course(course: Course):
+    course_index.add(*_course_document(course))
+
+async def rebuild_search_indexes(db):
+    """Load both indexes from the database, e.g. at application startup"""
+    resource_index.clear()
+    async for resource in await db.stream_scalars(
+        select(Resource).execution_options(yield_per=1000)
+    ):
+        index_resource(resource)
+    course_index.clear()
+    async for course in await db.stream_scalars(
+        select(Course).execution_options(yield_per=1000)
+    ):
+        index_course(course)
+
+# Indexed once the write commits, on this worker and (over the bus) on the others
+def _sync(name, index, document):
+    cache_sync.register(f"{name}:add", index.add)
+    cache_sync.register(f"{name}:remove", index.remove)
+
+    def on_write(mapper, connection, target):
+        cache_sync.on_commit(target, f"{name}:add", *document(target))
+
+    def on_delete(mapper, connection, target):
+        cache_sync.on_commit(target, f"{name}:remove", target.id)
+
+    return on_write, on_delete
+
+for _model, _name, _index, _document in (
+    (Resource, "search:resource", resource_index, _resource_document),
+    (Course, "search:course", course_index, _course_document),
+):
+    _on_write, _on_delete = _sync(_name, _index, _document)
+    event.listen(_model, "after_insert", _on_write)
+    event.listen(_model, "after_update", _on_write)
+    event.listen(_model, "after_delete", _on_delete)
@@ -0,0 +1,139 @@
+import math
+from threading import RLock
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event, select
+from app.models.resource import HealthcareFacility
+from app.services.cache_sync import cache_sync
+
+EARTH_RADIUS_KM = 6371.0088
+# On the same sphere as haversine(), so bounding boxes never undershoot
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class SpatialIndex:
+    """Grid-bucket index of points for radius and k-nearest queries
+
+    Points are bucketed into cell_deg x cell_deg lat/lon cells, so a query
+    only measures distances to points in the cells its bounding box
+    overlaps. Pure Python, so it behaves the same on SQLite and PostgreSQL.
+    """
+
+    def __init__(self, cell_deg: float = 0.1):
+        self.cell_deg = cell_deg
+        self._columns = int(math.ceil(360 / cell_deg))
+        self._rows = int(math.ceil(180 / cell_deg))
+        self._cells: Dict[Tuple[int, int], Dict[int, Tuple[float, float]]] = {}
+        self._points: Dict[int, Tuple[int, int]] = {}
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = min(int((lat + 90) / self.cell_deg), self._rows - 1)
+        column = int(((lon + 180) % 360) / self.cell_deg) % self._columns
+        return row, column
+
+    def upsert(self, point_id: int, lat: Optional[float], lon: Optional[float]):
+        with self._lock:
+            self.remove(point_id)
+            if lat is None or lon is None:
+                return
+            cell = self._cell(lat, lon)
+            self._cells.setdefault(cell, {})[point_id] = (lat, lon)
+            self._points[point_id] = cell
+
+    def remove(self, point_id: int):
+        with self._lock:
+            cell = self._points.pop(point_id, None)
+            if cell is None:
+                return
+            bucket = self._cells[cell]
+            del bucket[point_id]
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._points.clear()
+
+    def _cells_around(self, lat: float, lon: float, radius_km: float) -> Iterator[Tuple[int, int]]:
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        min_row, _ = self._cell(max(lat - dlat, -90.0), lon)
+        max_row, _ = self._cell(min(lat + dlat, 90.0), lon)
+
+        # Longitude degrees shrink towards the poles; use the widest latitude
+        widest = min(abs(lat) + dlat, 90.0)
+        cos_lat = math.cos(math.radians(widest))
+        if cos_lat < 1e-6 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+            columns = range(self._columns)
+        else:
+            dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+            _, first = self._cell(lat, lon - dlon)
+            span = int(math.ceil(2 * dlon / self.cell_deg)) + 1
+            columns = [(first + i) % self._columns for i in range(min(span, self._columns))]
+
+        for row in range(min_row, max_row + 1):
+            for column in columns:
+                cell = (row, column)
+                if cell in self._cells:
+                    yield cell
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float]]:
+        """(point_id, distance_km) for every point within radius_km, nearest first"""
+        results = []
+        with self._lock:
+            for cell in self._cells_around(lat, lon, radius_km):
+                for point_id, (plat, plon) in self._cells[cell].items():
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if distance <= radius_km:
+                        results.append((point_id, distance))
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int,
+                max_radius_km: float = math.pi * EARTH_RADIUS_KM) -> List[Tuple[int, float]]:
+        """The k closest points, found by doubling a radius search until it holds k"""
+        radius = self.cell_deg * KM_PER_DEGREE_LAT
+        while True:
+            radius = min(radius, max_radius_km)
+            results = self.within(lat, lon, radius)
+            if len(results) >= k or radius >= max_radius_km:
+                return results[:k]
+            radius *= 2
+
+facility_index = SpatialIndex()
+
+def index_facility(facility: HealthcareFacility):
+    facility_index.upsert(facility.id, facility.latitude, facility.longitude)
+
+async def rebuild_facility_index(db):
+    """Load every facility location, e.g. at application startup"""
+    facility_index.clear()
+    result = await db.stream(
+        select(HealthcareFacility.id, HealthcareFacility.latitude, HealthcareFacility.longitude)
+        .execution_options(yield_per=5000)
+    )
+    async for facility_id, latitude, longitude in result:
+        facility_index.upsert(facility_id, latitude, longitude)
+
+cache_sync.register("facility:upsert", facility_index.upsert)
+cache_sync.register("facility:remove", facility_index.remove)
+
+# Applied once the flush's transaction commits, on every worker
+def _on_write(mapper, connection, target):
+    cache_sync.on_commit(target, "facility:upsert", target.id, target.latitude, target.longitude)
+
+def _on_delete(mapper, connection, target):
+    cache_sync.on_commit(target, "facility:remove", target.id)
+
+event.listen(HealthcareFacility, "after_insert", _on_write)
+event.listen(HealthcareFacility, "after_update", _on_write)
+event.listen(HealthcareFacility, "after_delete", _on_delete)
@@ -0,0 +1,176 @@
+from typing import Any, Optional
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.course import Course, Lesson, Module
+from app.services.catalog_cache import invalidate_on_commit
+from app.utils.cache import TTLCache
+
+try:
+    import orjson
+
+    def dumps(value) -> bytes:
+        return orjson.dumps(value)
+except ImportError:  # pragma: no cover - stdlib fallback
+    import json
+
+    def dumps(value) -> bytes:
+        return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+_courses = Course.__table__
+_modules = Module.__table__
+_lessons = Lesson.__table__
+
+# Serialized syllabi keyed by (course_id, version); old versions age out
+syllabus_cache = TTLCache(max_entries=2048, ttl=3600.0)
+
+async def load_syllabus(db: AsyncSession, course_id: int) -> Optional[dict]:
+    """The ordered Course -> Module -> Lesson outline in three queries"""
+    course = (await db.execute(
+        select(
+            Course.id, Course.title, Course.description, Course.category, Course.level,
+            Course.image_url, Course.instructor_id, Course.total_duration,
+            Course.lesson_count, Course.version
+        ).where(Course.id == course_id)
+    )).mappings().first()
+    if course is None:
+        return None
+
+    modules = (await db.execute(
+        select(Module.id, Module.title, Module.description, Module.order,
+               Module.total_duration, Module.lesson_count)
+        .where(Module.course_id == course_id)
+        .order_by(Module.order, Module.id)
+    )).mappings().all()
+    lessons = (await db.execute(
+        select(Lesson.id, Lesson.module_id, Lesson.title, Lesson.type,
+               Lesson.duration, Lesson.order)
+        .join(Module, Module.id == Lesson.module_id)
+        .where(Module.course_id == course_id)
+        .order_by(Lesson.module_id, Lesson.order, Lesson.id)
+    )).mappings().all()
+
+    by_module = {module["id"]: {**module, "lessons": []} for module in modules}
+    for lesson in lessons:
+        lesson = dict(lesson)
+        by_module[lesson.pop("module_id")]["lessons"].append(lesson)
+    return {**course, "modules": list(by_module.values())}
+
+async def get_syllabus_json(db: AsyncSession, course_id: int) -> Optional[tuple]:
+    """(version, serialized syllabus); a cache hit costs one indexed lookup"""
+    version = await db.scalar(select(Course.version).where(Course.id == course_id))
+    if version is None:
+        return None
+    cached = syllabus_cache.get((course_id, version))
+    if cached is not None:
+        return version, cached
+    syllabus = await load_syllabus(db, course_id)
+    if syllabus is None:
+        return None
+    body = dumps(syllabus)
+    syllabus_cache.set((course_id, syllabus["version"]), body)
+    return syllabus["version"], body
+
+# Rollups move by deltas, never by re-summing the children: a SUM that
+# races a concurrent lesson change under READ COMMITTED overwrites it,
+# while "total = total + delta" is applied atomically by the database.
+# The previous values are read FOR UPDATE from the row being changed,
+# so they are right even when the attribute was never loaded.
+
+def _add_to_course(connection, course_id, duration: int = 0, lessons: int = 0):
+    if course_id is None:
+        return
+    connection.execute(
+        _courses.update()
+        .where(_courses.c.id == course_id)
+        .values(
+            total_duration=_courses.c.total_duration + duration,
+            lesson_count=_courses.c.lesson_count + lessons,
+            version=_courses.c.version + 1
+        )
+    )
+
+def _add_to_module(connection, module_id, duration: int, lessons: int):
+    if module_id is None:
+        return
+    connection.execute(
+        _modules.update()
+        .where(_modules.c.id == module_id)
+        .values(
+            total_duration=_modules.c.total_duration + duration,
+            lesson_count=_modules.c.lesson_count + lessons
+        )
+    )
+    _add_to_course(connection, select(_modules.c.course_id).where(
+        _modules.c.id == module_id
+    ).scalar_subquery(), duration, lessons)
+
+def _stored(connection, table, row_id, *columns):
+    return connection.execute(
+        select(*columns).where(table.c.id == row_id).with_for_update()
+    ).first()
+
+def _on_lesson_insert(mapper, connection, target: Lesson):
+    _add_to_module(connection, target.module_id, target.duration or 0, 1)
+
+def _on_lesson_update(mapper, connection, target: Lesson):
+    old = _stored(connection, _lessons, target.id, _lessons.c.module_id, _lessons.c.duration)
+    if old is None:
+        return
+    old_duration, new_duration = old.duration or 0, target.duration or 0
+    if old.module_id == target.module_id:
+        _add_to_module(connection, target.module_id, new_duration - old_duration, 0)
+    else:
+        _add_to_module(connection, old.module_id, -old_duration, -1)
+        _add_to_module(connection, target.module_id, new_duration, 1)
+
+def _on_lesson_delete(mapper, connection, target: Lesson):
+    old = _stored(connection, _lessons, target.id, _lessons.c.module_id, _lessons.c.duration)
+    if old is not None:
+        _add_to_module(connection, old.module_id, -(old.duration or 0), -1)
+
+def _on_module_insert(mapper, connection, target: Module):
+    _add_to_course(connection, target.course_id, target.total_duration or 0, target.lesson_count or 0)
+
+def _on_module_update(mapper, connection, target: Module):
+    old = _stored(connection, _modules, target.id, _modules.c.course_id,
+                  _modules.c.total_duration, _modules.c.lesson_count)
+    if old is None:
+        return
+    if old.course_id == target.course_id:
+        # Title or order changed; the totals are not the ORM's to set
+        _add_to_course(connection, target.course_id)
+    else:
+        _add_to_course(connection, old.course_id, -old.total_duration, -old.lesson_count)
+        _add_to_course(connection, target.course_id, old.total_duration, old.lesson_count)
+
+def _on_module_delete(mapper, connection, target: Module):
+    old = _stored(connection, _modules, target.id, _modules.c.course_id,
+                  _modules.c.total_duration, _modules.c.lesson_count)
+    if old is not None:
+        _add_to_course(connection, old.course_id, -old.total_duration, -old.lesson_count)
+
+# Course columns that appear in the syllabus; counters such as
+# enrolled_count change often and must not invalidate it
+SYLLABUS_COURSE_FIELDS = ("title", "description", "category", "level", "image_url", "instructor_id")
+
+def _on_course_update(mapper, connection, target: Course):
+    state = inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in SYLLABUS_COURSE_FIELDS):
+        # In SQL: rollup changes bump the stored version behind the ORM's back
+        target.version = Course.version + 1
+
+event.listen(Lesson, "after_insert", _on_lesson_insert)
+event.listen(Lesson, "before_update", _on_lesson_update)
+event.listen(Lesson, "before_delete", _on_lesson_delete)
+event.listen(Module, "after_insert", _on_module_insert)
+event.listen(Module, "before_update", _on_module_update)
+event.listen(Module, "before_delete", _on_module_delete)
+event.listen(Course, "before_update", _on_course_update)
+
+def _invalidate_catalog(mapper, connection, target: Any):
+    # The catalog snapshots include the rollups, which change in SQL
+    invalidate_on_commit(target)
+
+for _model in (Lesson, Module):
+    for _event_name in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event_name, _invalidate_catalog)
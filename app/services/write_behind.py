@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.async_database import AsyncSessionLocal
+from app.models.resource import Resource, ResourceDownload, ResourceView
+
+logger = logging.getLogger(__name__)
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors worth retrying: lost connections, lock timeouts, pool exhaustion"""
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc, (OperationalError, InterfaceError))
+    return isinstance(exc, (PoolTimeoutError, OSError, asyncio.TimeoutError))
+
+class ResourceActivityBuffer:
+    """Write-behind buffer for resource views, downloads and download counts
+
+    Rows are queued in memory and written with one bulk INSERT per table;
+    download_count increments are coalesced per resource into a single
+    UPDATE per flush. A flush happens when max_batch rows are pending,
+    every flush_interval seconds, and on shutdown.
+
+    Rows for resources that no longer exist are dropped at flush time.
+    A batch that fails on a transient error (lost connection, lock
+    timeout) is put back and retried; any other failure drops the batch
+    so one bad row cannot block later flushes. At most max_pending rows
+    are held, and the oldest are dropped first while the database is down.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, max_batch: int = 1000,
+                 flush_interval: float = 2.0, max_pending: int = 50000):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._views = []
+        self._downloads = []
+        self._download_deltas = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.rows_dropped = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return len(self._views) + len(self._downloads)
+
+    def record_view(self, resource_id: int, user_id: int, ip_address: Optional[str]):
+        if self.depth >= self.max_pending:
+            self.rows_dropped += 1
+            return
+        self._views.append({
+            "resource_id": resource_id,
+            "user_id": user_id,
+            "viewed_at": datetime.utcnow(),
+            "ip_address": ip_address
+        })
+        self._maybe_flush()
+
+    def record_download(self, resource_id: int, user_id: int, ip_address: Optional[str]):
+        if self.depth >= self.max_pending:
+            self.rows_dropped += 1
+            return
+        self._downloads.append({
+            "resource_id": resource_id,
+            "user_id": user_id,
+            "downloaded_at": datetime.utcnow(),
+            "ip_address": ip_address
+        })
+        self._download_deltas[resource_id] += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (self.depth >= self.max_batch and not self._flush_lock.locked()
+                and (self._flush_task is None or self._flush_task.done())):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def _existing_resources(self, db, resource_ids) -> set:
+        return set((await db.scalars(
+            select(Resource.id).where(Resource.id.in_(resource_ids))
+        )).all())
+
+    def _requeue(self, views, downloads, deltas):
+        self._views[:0] = views
+        self._downloads[:0] = downloads
+        self._download_deltas.update(deltas)
+        # Keep the newest rows if the database has been down for a while
+        overflow = self.depth - self.max_pending
+        if overflow > 0:
+            dropped_views = min(overflow, len(self._views))
+            del self._views[:dropped_views]
+            dropped = self._downloads[:overflow - dropped_views]
+            del self._downloads[:overflow - dropped_views]
+            for row in dropped:
+                self._download_deltas[row["resource_id"]] -= 1
+            self._download_deltas = +self._download_deltas
+            self.rows_dropped += overflow
+
+    async def flush(self):
+        async with self._flush_lock:
+            views, self._views = self._views, []
+            downloads, self._downloads = self._downloads, []
+            deltas, self._download_deltas = self._download_deltas, Counter()
+            if not (views or downloads):
+                return
+
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    existing = await self._existing_resources(
+                        db, {row["resource_id"] for row in views} | set(deltas)
+                    )
+                    kept_views = [row for row in views if row["resource_id"] in existing]
+                    kept_downloads = [row for row in downloads if row["resource_id"] in existing]
+                    self.rows_dropped += len(views) + len(downloads) - len(kept_views) - len(kept_downloads)
+                    if kept_views:
+                        await db.execute(insert(ResourceView), kept_views)
+                    if kept_downloads:
+                        await db.execute(insert(ResourceDownload), kept_downloads)
+                    counters = [
+                        {"resource_id": rid, "delta": n}
+                        for rid, n in deltas.items() if rid in existing
+                    ]
+                    if counters:
+                        table = Resource.__table__
+                        await db.execute(
+                            table.update()
+                            .where(table.c.id == bindparam("resource_id"))
+                            .values(download_count=table.c.download_count + bindparam("delta")),
+                            counters
+                        )
+                    await db.commit()
+            except Exception as exc:
+                rows = len(views) + len(downloads)
+                if is_transient(exc):
+                    logger.warning("Flushing %d resource activity rows failed, requeueing: %s",
+                                   rows, exc)
+                    self._requeue(views, downloads, deltas)
+                else:
+                    logger.exception("Dropping %d resource activity rows that cannot be written",
+                                     rows)
+                    self.rows_dropped += rows
+                return
+
+            elapsed = time.perf_counter() - start
+            self.flush_count += 1
+            self.rows_flushed += len(kept_views) + len(kept_downloads)
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        # Let the loop finish its current flush rather than cancelling it
+        # mid-write, which would lose the rows it had taken off the buffer
+        self._stopping.set()
+        for task in (self._task, self._flush_task):
+            if task is not None:
+                await asyncio.gather(task, return_exceptions=True)
+        self._task = None
+        self._flush_task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "pendingViews": len(self._views),
+            "pendingDownloads": len(self._downloads),
+            "pendingCounterResources": len(self._download_deltas),
+            "flushCount": self.flush_count,
+            "rowsFlushed": self.rows_flushed,
+            "rowsDropped": self.rows_dropped,
+            "lastFlushSeconds": self.last_flush_seconds,
+            "maxFlushSeconds": self.max_flush_seconds
+        }
+
+activity_buffer = ResourceActivityBuffer()
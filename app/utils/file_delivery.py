@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+import anyio
+from fastapi import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+CHUNK_SIZE = 256 * 1024
+# Accept-Encoding token -> suffix of the precompressed file next to the original
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+def make_etag(st: os.stat_result, variant: str = "") -> str:
+    """Strong validator from inode, size and mtime; changes whenever the bytes do"""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}{variant}"'
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range 'bytes=' header into an inclusive (start, end)
+
+    Returns None when the header is absent or asks for several ranges (the
+    full body is served instead) and raises ValueError when unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    if size == 0:
+        # An empty file has no byte positions to satisfy any range
+        raise ValueError(header)
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    if not start:
+        length = int(end)
+        if length <= 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip() for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def content_disposition(filename: str, disposition: str = "attachment") -> str:
+    """RFC 6266 header value; non-ASCII or quoted names use filename*= (RFC 5987)"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+def _pick_variant(request: Request, path: str) -> Tuple[str, Optional[str]]:
+    accepted = {
+        token.split(";")[0].strip()
+        for token in request.headers.get("accept-encoding", "").split(",")
+    }
+    for encoding, suffix in PRECOMPRESSED:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+class RangeFileResponse(Response):
+    """Send part or all of a file, zero-copy when the server supports it"""
+
+    def __init__(self, path: str, offset: int, count: int, status_code: int, headers: dict,
+                 media_type: Optional[str] = None):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.headers["content-length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f.wrapped,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            await f.seek(self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+async def file_response(request: Request, path: str, filename: Optional[str] = None,
+                        media_type: Optional[str] = None,
+                        cache_control: str = "private, max-age=300") -> Response:
+    """Serve path honouring conditional, Range and Accept-Encoding headers"""
+    if media_type is None:
+        media_type = mimetypes.guess_type(filename or path)[0] or "application/octet-stream"
+    range_header = request.headers.get("range")
+    # Ranges always address the identity bytes, so only whole-file
+    # responses may use a precompressed variant
+    send_path, encoding = (path, None) if range_header else _pick_variant(request, path)
+
+    st = await anyio.to_thread.run_sync(os.stat, send_path)
+    if not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(send_path)
+
+    etag = make_etag(st, f"-{encoding}" if encoding else "")
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+        "vary": "Accept-Encoding",
+    }
+    if filename:
+        headers["content-disposition"] = content_disposition(filename)
+
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["content-encoding"] = encoding
+
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, st.st_size)
+        except ValueError:
+            headers["content-range"] = f"bytes */{st.st_size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["content-range"] = f"bytes {start}-{end}/{st.st_size}"
+            return RangeFileResponse(
+                send_path, start, end - start + 1, 206, headers, media_type
+            )
+
+    return RangeFileResponse(send_path, 0, st.st_size, 200, headers, media_type)
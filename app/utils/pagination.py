@@ -0,0 +1,127 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, inspect, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import AsyncSessionLocal
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values: Any) -> str:
+    """Pack the sort key of the last row on a page into an opaque cursor"""
+    payload = json.dumps(jsonable_encoder(list(values)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def decode_offset(cursor: Optional[str]) -> int:
+    """Position cursor for lists ranked in memory (search relevance, distance)"""
+    if not cursor:
+        return 0
+    values = decode_cursor(cursor)
+    if len(values) != 1 or type(values[0]) is not int or values[0] < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values[0]
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    elif python_type is float and type(value) in (int, float):
+        return value
+    elif type(value) is python_type:
+        return value
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _nullable(column) -> bool:
+    return getattr(getattr(column, "expression", column), "nullable", True)
+
+async def keyset_page(db: AsyncSession, stmt, sort_column, id_column, cursor: Optional[str],
+                      limit: int, descending: bool = False) -> Tuple[list, Optional[str]]:
+    """Fetch one page of stmt ordered by (sort_column, id_column)
+
+    Rows are located by seeking past the cursor instead of OFFSET, so deep
+    pages cost the same as the first one. sort_column may be None to page
+    on the id alone. Rows whose sort_column is NULL come last in either
+    direction, paged by id; they are fetched by a second query only once
+    the non-NULL rows run out, so both queries can still use the index.
+    Returns the rows and the cursor for the next page.
+    """
+    columns = [c for c in (sort_column, id_column) if c is not None]
+    values = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns) or values[-1] is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        values = [_coerce(c, v) for c, v in zip(columns, values)]
+    after = (lambda c, v: c < v) if descending else (lambda c, v: c > v)
+    order = (lambda c: c.desc()) if descending else (lambda c: c.asc())
+
+    if sort_column is None:
+        if values:
+            stmt = stmt.where(after(id_column, values[0]))
+        rows = (await db.scalars(stmt.order_by(order(id_column)).limit(limit + 1))).all()
+    else:
+        nullable = _nullable(sort_column)
+        rows = []
+        if values is None or values[0] is not None:
+            page = stmt.where(sort_column.is_not(None)) if nullable else stmt
+            if values:
+                page = page.where(or_(
+                    after(sort_column, values[0]),
+                    and_(sort_column == values[0], after(id_column, values[1]))
+                ))
+            page = page.order_by(order(sort_column), order(id_column))
+            rows = list((await db.scalars(page.limit(limit + 1))).all())
+        if nullable and len(rows) <= limit:
+            page = stmt.where(sort_column.is_(None))
+            if values and values[0] is None:
+                page = page.where(after(id_column, values[1]))
+            page = page.order_by(order(id_column))
+            rows.extend((await db.scalars(page.limit(limit + 1 - len(rows)))).all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(*[getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+def row_to_dict(row) -> dict:
+    return {attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs}
+
+async def _ndjson_lines(stmt, chunk_size: int) -> AsyncIterator[bytes]:
+    # The request's session may be closed before the body is sent, so the
+    # stream owns its own session for as long as the cursor is open
+    async with AsyncSessionLocal() as db:
+        result = await db.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            lines = [json.dumps(jsonable_encoder(row_to_dict(row))) for row in rows]
+            yield ("\n".join(lines) + "\n").encode()
+
+def stream_ndjson(stmt, chunk_size: int = 500) -> StreamingResponse:
+    """Stream a select() as newline-delimited JSON from a server-side cursor"""
+    return StreamingResponse(
+        _ndjson_lines(stmt, chunk_size),
+        media_type="application/x-ndjson"
+    )
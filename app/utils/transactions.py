@@ -0,0 +1,56 @@
+import logging
+from typing import Callable
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+logger = logging.getLogger(__name__)
+
+_CALLBACKS = "after_commit_callbacks"
+
+def _open_savepoints(session: Session) -> tuple:
+    savepoints = []
+    transaction = session.get_nested_transaction()
+    while transaction is not None:
+        if transaction.nested:
+            savepoints.append(transaction)
+        transaction = transaction.parent
+    return tuple(savepoints)
+
+def after_commit(target, callback: Callable, *args):
+    """Run callback(*args) once target's session commits its transaction
+
+    For in-process state derived from rows, such as indexes and caches,
+    which must never show a change that is rolled back. Callbacks queued
+    inside a savepoint are dropped when that savepoint rolls back. target
+    is a Session or a mapped object; detached objects run callback now.
+    """
+    session = target if isinstance(target, Session) else object_session(target)
+    if session is None:
+        callback(*args)
+        return
+    session.info.setdefault(_CALLBACKS, []).append((_open_savepoints(session), callback, args))
+
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session: Session):
+    # Also fired when a savepoint is released; wait for the real commit
+    if session.in_nested_transaction():
+        return
+    for _, callback, args in session.info.pop(_CALLBACKS, ()):
+        try:
+            callback(*args)
+        except Exception:
+            logger.exception("After-commit callback %r failed", callback)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_savepoint_callbacks(session: Session, previous_transaction):
+    pending = session.info.get(_CALLBACKS)
+    if pending and previous_transaction.nested:
+        session.info[_CALLBACKS] = [
+            entry for entry in pending if previous_transaction not in entry[0]
+        ]
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_stale_callbacks(session: Session, transaction):
+    # Anything left when the outermost transaction ends was never committed
+    if transaction.parent is None:
+        session.info.pop(_CALLBACKS, None)
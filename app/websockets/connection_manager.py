@@ -1,28 +1,258 @@
 from fastapi import WebSocket
-from typing import Dict, Set
+from typing import Dict, Iterable, Optional, Set
+import asyncio
 import json
+import logging
+import re
+import time
+from app.websockets.pubsub import PubSubBackend
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to clients that cannot keep up ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Channels are scoped to one course, forum topic or event, e.g. "course:12"
+CHANNEL_PATTERN = re.compile(r"^(course|topic|event):\d+$")
+# Bus topics: everyone, one user's sockets, or one channel's subscribers
+BROADCAST_TOPIC = "broadcast"
+USER_TOPIC_PREFIX = "user:"
+CHANNEL_TOPIC_PREFIX = "channel:"
+
+class ClientConnection:
+    """A websocket with its own bounded send queue and writer task"""
+
+    def __init__(self, manager: "ConnectionManager", websocket: WebSocket, user_id: int):
+        self.manager = manager
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=manager.max_queue_size)
+        self.dropped = 0
+        self.closed = False
+        self.send_started: Optional[float] = None
+        self.channels: Set[str] = set()
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+
+    def enqueue(self, payload: str) -> bool:
+        """Queue an already serialized message without waiting on the socket"""
+        if self.closed:
+            return False
+        # Checked here rather than with a per-send timeout, which would cost
+        # an extra task per message per socket
+        if (self.send_started is not None
+                and time.monotonic() - self.send_started > self.manager.send_timeout):
+            self.close(SLOW_CONSUMER_CLOSE_CODE)
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.manager.overflow_policy == "disconnect":
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                payload = await self.queue.get()
+                self.send_started = time.monotonic()
+                await self.websocket.send_text(payload)
+                self.send_started = None
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # Send failed; the client is gone
+            self.close(SLOW_CONSUMER_CLOSE_CODE)
+
+    def close(self, code: Optional[int] = None):
+        if self.closed:
+            return
+        self.closed = True
+        self.manager._discard(self)
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if code is not None:
+            asyncio.get_running_loop().create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
+    def __init__(self, max_queue_size: int = 256, send_timeout: float = 10.0,
+                 overflow_policy: str = "disconnect", bus: Optional[PubSubBackend] = None):
+        # overflow_policy: "disconnect" closes a client whose queue is full,
+        # "drop" discards the message for that client only.
+        # bus: when set, messages go through it so that every worker/node
+        # delivers to its own local sockets; otherwise delivery is local only
+        self.bus = bus
+        self._bus_tasks: Set[asyncio.Task] = set()
+        self._bus_lock = asyncio.Lock()
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
+        self.overflow_policy = overflow_policy
+        self.active_connections: Dict[int, Set[ClientConnection]] = {}
+        self.channels: Dict[str, Set[ClientConnection]] = {}
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+
+    async def start(self):
+        if self.bus is not None:
+            await self.bus.start(self._on_bus_message)
+            await self.bus.subscribe(BROADCAST_TOPIC)
+
+    async def stop(self):
+        if self.bus is not None:
+            if self._bus_tasks:
+                await asyncio.gather(*self._bus_tasks, return_exceptions=True)
+            await self.bus.stop()
+
+    def _wants(self, topic: str) -> bool:
+        if topic.startswith(USER_TOPIC_PREFIX):
+            return int(topic[len(USER_TOPIC_PREFIX):]) in self.active_connections
+        if topic.startswith(CHANNEL_TOPIC_PREFIX):
+            return topic[len(CHANNEL_TOPIC_PREFIX):] in self.channels
+        return True
+
+    async def _sync_topic(self, topic: str):
+        # Reconciles the bus with local state as it is now, not as it was
+        # when the call was queued: a late unsubscribe after a quick
+        # re-subscribe then leaves the topic subscribed
+        async with self._bus_lock:
+            if self._wants(topic):
+                await self.bus.subscribe(topic)
+            else:
+                await self.bus.unsubscribe(topic)
+
+    def _bus_sync(self, topic: str):
+        # Fire-and-forget from synchronous cleanup paths
+        task = asyncio.get_running_loop().create_task(self._sync_topic(topic))
+        self._bus_tasks.add(task)
+        task.add_done_callback(self._bus_task_done)
+
+    def _bus_task_done(self, task: asyncio.Task):
+        self._bus_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Pub/sub bookkeeping failed", exc_info=task.exception())
+
+    async def _on_bus_message(self, topic: str, payload: str):
+        if topic == BROADCAST_TOPIC:
+            self._fan_out(payload, self._clients.values())
+        elif topic.startswith(USER_TOPIC_PREFIX):
+            user_id = int(topic[len(USER_TOPIC_PREFIX):])
+            self._fan_out(payload, self.active_connections.get(user_id, ()))
+        elif topic.startswith(CHANNEL_TOPIC_PREFIX):
+            channel = topic[len(CHANNEL_TOPIC_PREFIX):]
+            self._fan_out(payload, self.channels.get(channel, ()))
 
     async def connect(self, websocket: WebSocket, user_id: int):
         await websocket.accept()
+        client = ClientConnection(self, websocket, user_id)
+        self._clients[websocket] = client
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
-        self.active_connections[user_id].add(websocket)
+        self.active_connections[user_id].add(client)
+        if self.bus is not None:
+            await self._sync_topic(f"{USER_TOPIC_PREFIX}{user_id}")
+        client.start()
 
     async def disconnect(self, websocket: WebSocket, user_id: int):
-        self.active_connections[user_id].remove(websocket)
-        if not self.active_connections[user_id]:
-            del self.active_connections[user_id]
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.close()
+
+    def _discard(self, client: ClientConnection):
+        self._clients.pop(client.websocket, None)
+        connections = self.active_connections.get(client.user_id)
+        if connections is not None:
+            connections.discard(client)
+            if not connections:
+                del self.active_connections[client.user_id]
+                if self.bus is not None:
+                    self._bus_sync(f"{USER_TOPIC_PREFIX}{client.user_id}")
+        for channel in list(client.channels):
+            self._leave(client, channel)
+
+    def _leave(self, client: ClientConnection, channel: str):
+        client.channels.discard(channel)
+        subscribers = self.channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(client)
+            if not subscribers:
+                del self.channels[channel]
+                if self.bus is not None:
+                    self._bus_sync(f"{CHANNEL_TOPIC_PREFIX}{channel}")
+
+    @staticmethod
+    def is_valid_channel(channel) -> bool:
+        return isinstance(channel, str) and CHANNEL_PATTERN.match(channel) is not None
+
+    async def subscribe(self, websocket: WebSocket, channel: str) -> bool:
+        client = self._clients.get(websocket)
+        if client is None or not self.is_valid_channel(channel):
+            return False
+        if channel not in self.channels:
+            self.channels[channel] = set()
+        client.channels.add(channel)
+        self.channels[channel].add(client)
+        if self.bus is not None:
+            await self._sync_topic(f"{CHANNEL_TOPIC_PREFIX}{channel}")
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, channel: str):
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._leave(client, channel)
+
+    def is_subscribed(self, websocket: WebSocket, channel: str) -> bool:
+        client = self._clients.get(websocket)
+        return client is not None and channel in client.channels
+
+    @staticmethod
+    def _serialize(message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"), default=str)
+
+    def _fan_out(self, payload: str, clients: Iterable[ClientConnection]) -> int:
+        delivered = 0
+        # Copy first: enqueue may disconnect slow clients while iterating
+        for client in list(clients):
+            if client.enqueue(payload):
+                delivered += 1
+        return delivered
 
     async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_json(message)
+        if self.bus is not None:
+            await self.bus.publish(f"{USER_TOPIC_PREFIX}{user_id}", self._serialize(message))
+        elif user_id in self.active_connections:
+            self._fan_out(self._serialize(message), self.active_connections[user_id])
+
+    async def send_to_connection(self, websocket: WebSocket, message: dict):
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.enqueue(self._serialize(message))
+
+    async def publish(self, channel: str, message: dict):
+        """Send a message to the subscribers of one channel only"""
+        if self.bus is not None:
+            await self.bus.publish(f"{CHANNEL_TOPIC_PREFIX}{channel}", self._serialize(message))
+            return
+        subscribers = self.channels.get(channel)
+        if subscribers:
+            self._fan_out(self._serialize(message), subscribers)
 
     async def broadcast(self, message: dict):
-        for connections in self.active_connections.values():
-            for connection in connections:
-                await connection.send_json(message)
\ No newline at end of file
+        if self.bus is not None:
+            await self.bus.publish(BROADCAST_TOPIC, self._serialize(message))
+        else:
+            self._fan_out(self._serialize(message), self._clients.values())
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._clients)
+
+    def queue_depth(self) -> int:
+        return sum(client.queue.qsize() for client in self._clients.values())
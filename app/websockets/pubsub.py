@@ -0,0 +1,268 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Called with (topic, payload) for every message published on a subscribed topic
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+class PubSubBackend:
+    """Transport that carries websocket messages between server processes
+
+    Every node subscribes to the topics its local sockets care about and
+    publishes everything else; each node then delivers only to its own
+    connections.
+    """
+
+    async def start(self, handler: MessageHandler):
+        raise NotImplementedError
+
+    async def stop(self):
+        raise NotImplementedError
+
+    async def publish(self, topic: str, payload: str):
+        raise NotImplementedError
+
+    async def subscribe(self, topic: str):
+        raise NotImplementedError
+
+    async def unsubscribe(self, topic: str):
+        raise NotImplementedError
+
+class InProcessBroker:
+    """Shared hub for InProcessPubSub nodes living in the same process"""
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set["InProcessPubSub"]] = {}
+
+class InProcessPubSub(PubSubBackend):
+    def __init__(self, broker: Optional[InProcessBroker] = None):
+        self.broker = broker or InProcessBroker()
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+
+    async def stop(self):
+        for nodes in self.broker.subscribers.values():
+            nodes.discard(self)
+        self._handler = None
+
+    async def publish(self, topic: str, payload: str):
+        for node in list(self.broker.subscribers.get(topic, ())):
+            if node._handler is not None:
+                await node._handler(topic, payload)
+
+    async def subscribe(self, topic: str):
+        self.broker.subscribers.setdefault(topic, set()).add(self)
+
+    async def unsubscribe(self, topic: str):
+        nodes = self.broker.subscribers.get(topic)
+        if nodes is not None:
+            nodes.discard(self)
+            if not nodes:
+                del self.broker.subscribers[topic]
+
+class RedisProtocolError(Exception):
+    pass
+
+def _encode_command(*args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis connection closed")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        raise RedisProtocolError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RedisProtocolError(f"Unexpected reply type {kind!r}")
+
+class RedisPubSub(PubSubBackend):
+    """Pub/sub over the Redis wire protocol (RESP) with no client dependency
+
+    Uses one connection for PUBLISH and one in subscriber mode. Works with
+    Redis, Valkey/KeyDB or any local stand-in speaking RESP. Both
+    connections reconnect if they drop, and the listener resubscribes;
+    publishes made while the publish connection is down fail fast.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379,
+                 password: Optional[str] = None, prefix: str = "ws:",
+                 reconnect_delay: float = 1.0, publish_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.prefix = prefix
+        self.reconnect_delay = reconnect_delay
+        self.publish_timeout = publish_timeout
+        self.topics: Set[str] = set()
+        self._handler: Optional[MessageHandler] = None
+        self._pub: Optional[tuple] = None
+        self._sub_writer: Optional[asyncio.StreamWriter] = None
+        self._pending: deque = deque()
+        self._tasks = []
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisPubSub":
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            password=parsed.password,
+            **kwargs
+        )
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(_encode_command("AUTH", self.password))
+            await _read_reply(reader)
+        return reader, writer
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._pub = await self._open()
+        sub_reader, self._sub_writer = await self._open()
+        # Topics subscribed before start() are sent now
+        if self.topics:
+            self._sub_writer.write(_encode_command(
+                "SUBSCRIBE", *[self.prefix + t for t in self.topics]
+            ))
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._read_publish_replies()),
+            loop.create_task(self._listen(sub_reader)),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for writer in (self._pub[1] if self._pub else None, self._sub_writer):
+            if writer is not None:
+                writer.close()
+        self._pub = None
+        self._sub_writer = None
+        while self._pending:
+            self._pending.popleft().cancel()
+
+    async def publish(self, topic: str, payload: str):
+        if self._pub is None:
+            raise ConnectionError(f"Not connected to Redis at {self.host}:{self.port}")
+        # Commands are pipelined; replies come back in order and resolve
+        # the matching future, so concurrent publishers never wait on a lock
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        self._pub[1].write(_encode_command("PUBLISH", self.prefix + topic, payload))
+        # A timed-out future stays queued so later replies still line up
+        await asyncio.wait_for(future, self.publish_timeout)
+
+    async def _read_publish_replies(self):
+        while True:
+            try:
+                reply = await _read_reply(self._pub[0])
+            except RedisProtocolError as exc:
+                reply = exc
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                self._pub[1].close()
+                self._pub = None
+                while self._pending:
+                    future = self._pending.popleft()
+                    if not future.done():
+                        future.set_exception(ConnectionError(str(exc)))
+                logger.warning("Lost publish connection to %s:%s, reconnecting",
+                               self.host, self.port)
+                self._pub = await self._open_retrying()
+                continue
+            future = self._pending.popleft()
+            if future.done():
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+    async def subscribe(self, topic: str):
+        if topic not in self.topics:
+            self.topics.add(topic)
+            # Before start() or while reconnecting, the (re)connect sends it
+            if self._sub_writer is not None:
+                self._sub_writer.write(_encode_command("SUBSCRIBE", self.prefix + topic))
+
+    async def unsubscribe(self, topic: str):
+        if topic in self.topics:
+            self.topics.discard(topic)
+            if self._sub_writer is not None:
+                self._sub_writer.write(_encode_command("UNSUBSCRIBE", self.prefix + topic))
+
+    async def _listen(self, reader: asyncio.StreamReader):
+        while True:
+            try:
+                reply = await _read_reply(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                logger.warning("Lost pub/sub connection to %s:%s, reconnecting",
+                               self.host, self.port)
+                reader = await self._reconnect()
+                continue
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                topic = reply[1].decode()[len(self.prefix):]
+                try:
+                    await self._handler(topic, reply[2].decode())
+                except Exception:
+                    logger.exception("Delivering pub/sub message on %s failed", topic)
+
+    async def _open_retrying(self) -> tuple:
+        while True:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                return await self._open()
+            except OSError:
+                continue
+
+    async def _reconnect(self) -> asyncio.StreamReader:
+        self._sub_writer.close()
+        self._sub_writer = None
+        reader, writer = await self._open_retrying()
+        if self.topics:
+            writer.write(_encode_command(
+                "SUBSCRIBE", *[self.prefix + t for t in self.topics]
+            ))
+        self._sub_writer = writer
+        return reader
+
+def backend_from_url(url: Optional[str], **kwargs) -> Optional[PubSubBackend]:
+    """redis://host:port -> RedisPubSub, memory:// -> InProcessPubSub, empty -> None
+
+    kwargs (e.g. a topic prefix) are passed to the Redis backend.
+    """
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "redis":
+        return RedisPubSub.from_url(url, **kwargs)
+    if scheme == "memory":
+        return InProcessPubSub()
+    raise ValueError(f"Unsupported pub/sub backend: {url}")
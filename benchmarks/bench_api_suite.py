@@ -0,0 +1,347 @@
+"""End-to-end benchmark of the API hot paths with JSON baselines.
+
+Seeds a SQLite database at the chosen scale, mounts the course, resource
+and event routers on an in-process FastAPI app and drives them over ASGI
+with concurrent httpx clients. No network is involved. Scenarios:
+list_courses, search_resources, register_for_event, track_resource_view
+and a websocket broadcast to many in-process sockets. For each one it
+reports throughput, p50/p95/p99 latency and SQL statements per request.
+
+Save a baseline, then compare later runs against it. The run fails when
+p95 or throughput is worse than the threshold allows, or when a
+scenario issues more queries per request than before. Timings depend on
+the machine, so record the baseline where the comparison will run
+rather than committing one:
+
+    python -m benchmarks.bench_api_suite --scale small --save-baseline benchmarks/baseline-small.json
+    python -m benchmarks.bench_api_suite --scale small --baseline benchmarks/baseline-small.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import create_engine, event, insert
+
+SCALES = {
+    "small": {"courses": 1000, "resources": 2000, "views": 100_000, "events": 200,
+              "users": 5000, "sockets": 1000},
+    "full": {"courses": 10_000, "resources": 20_000, "views": 1_000_000, "events": 2000,
+             "users": 50_000, "sockets": 10_000},
+}
+CATEGORIES = ["maternal-health", "nutrition", "mental-health", "first-aid", "hygiene"]
+WORDS = ["pregnancy", "vaccination", "breastfeeding", "malaria", "anxiety", "burns",
+         "handwashing", "newborn", "diet", "fever", "sleep", "water"]
+SEED_CHUNK = 10_000
+
+# Statements executed on behalf of the request currently being timed
+_query_box: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("query_box", default=None)
+
+def seed(url: str, scale: dict, rng: random.Random):
+    # Every model module, so create_all can resolve all foreign keys
+    from app.models import (  # noqa: F401
+        assessment, community, content, course, event, job, progress, resource, user
+    )
+    from app.database import Base
+    from app.models.course import Course
+    from app.models.event import Event
+    from app.models.resource import Resource, ResourceView
+    from datetime import datetime, timedelta
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+
+    def chunks(rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == SEED_CHUNK:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with engine.begin() as conn:
+        for batch in chunks({
+            "id": i,
+            "title": f"{rng.choice(WORDS).title()} basics {i}",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "category": rng.choice(CATEGORIES),
+            "level": rng.choice(["beginner", "intermediate", "advanced"]),
+            "enrolled_count": rng.randrange(1000),
+            "created_at": now - timedelta(minutes=i)
+        } for i in range(1, scale["courses"] + 1)):
+            conn.execute(insert(Course), batch)
+
+        for batch in chunks({
+            "id": i,
+            "title": f"{rng.choice(WORDS).title()} guide {i}",
+            "description": " ".join(rng.choices(WORDS, k=30)),
+            "category": rng.choice(CATEGORIES),
+            "type": rng.choice(["article", "video", "pdf"]),
+            "download_count": 0,
+            "created_at": now - timedelta(minutes=i)
+        } for i in range(1, scale["resources"] + 1)):
+            conn.execute(insert(Resource), batch)
+
+        for batch in chunks({
+            "resource_id": rng.randrange(1, scale["resources"] + 1),
+            "user_id": rng.randrange(1, scale["users"] + 1),
+            "ip_address": "127.0.0.1",
+            "viewed_at": now - timedelta(seconds=rng.randrange(86400 * 30))
+        } for _ in range(scale["views"])):
+            conn.execute(insert(ResourceView), batch)
+
+        for batch in chunks({
+            "id": i,
+            "title": f"Community session {i}",
+            "datetime": now + timedelta(days=1 + i % 60, hours=i % 24),
+            "duration": 60,
+            "max_attendees": 100,
+            "current_attendees": 0
+        } for i in range(1, scale["events"] + 1)):
+            conn.execute(insert(Event), batch)
+    engine.dispose()
+
+def build_app():
+    from fastapi import FastAPI, Request
+    from app.async_database import async_engine
+    from app.auth.dependencies import get_current_user
+    from app.routes import courses, events, resources
+
+    app = FastAPI()
+    for module in (courses, resources, events):
+        app.include_router(module.router)
+
+    async def bench_user(request: Request):
+        return SimpleNamespace(id=int(request.headers.get("x-bench-user", "1")), is_premium=True)
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        box = _query_box.get()
+        if box is not None:
+            box[0] += 1
+
+    return app
+
+def percentile(cuts: List[float], p: int) -> float:
+    return round(cuts[p - 1], 3) if cuts else 0.0
+
+async def run_scenario(name: str, call: Callable[[int], Awaitable[bool]],
+                       requests: int, clients: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await call(-1 - i)
+
+    latencies, queries, errors = [], [], 0
+    pending = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for i in pending:
+            box = [0]
+            token = _query_box.set(box)
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            _query_box.reset(token)
+            queries.append(box[0])
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throughput": round(requests / elapsed, 1),
+        "p50": percentile(cuts, 50),
+        "p95": percentile(cuts, 95),
+        "p99": percentile(cuts, 99),
+        "queriesPerRequest": round(sum(queries) / max(len(queries), 1), 2)
+    }
+    print(f"{name:>20} {result['throughput']:>9.1f} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+          f"{result['p99']:>8.2f} {result['queriesPerRequest']:>8.2f} {errors:>6}")
+    return result
+
+class BenchSocket:
+    """Stands in for a websocket; counts deliveries of the current message"""
+
+    def __init__(self, tracker: dict):
+        self.tracker = tracker
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, data: str):
+        self.tracker["delivered"] += 1
+        if self.tracker["delivered"] >= self.tracker["expected"]:
+            self.tracker["done"].set()
+
+async def broadcast_scenario(sockets: int):
+    from app.websockets.connection_manager import ConnectionManager
+
+    manager = ConnectionManager()
+    tracker = {"delivered": 0, "expected": sockets, "done": asyncio.Event()}
+    for user_id in range(sockets):
+        await manager.connect(BenchSocket(tracker), user_id)
+
+    async def call(i: int) -> bool:
+        tracker["delivered"] = 0
+        tracker["done"].clear()
+        await manager.broadcast({"type": "announcement", "seq": i, "message": "x" * 200})
+        await asyncio.wait_for(tracker["done"].wait(), 30)
+        return True
+
+    return call
+
+async def main(args) -> int:
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key, None):
+            scale[key] = getattr(args, key)
+    rng = random.Random(args.seed)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = "sqlite:///" + path
+    # Must be set before the app modules create their engine
+    os.environ["DATABASE_URL"] = url
+    start = time.perf_counter()
+    seed(url, scale, rng)
+    print(f"seeded {scale} in {time.perf_counter() - start:.1f}s")
+
+    import httpx
+    app = build_app()
+    await app.router.startup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        next_user = iter(range(scale["users"] + 1, 10 ** 9))
+
+        async def list_courses(i: int) -> bool:
+            response = await http.get("/courses", params={
+                "limit": 20, "category": rng.choice(CATEGORIES), "sort_by": "popular"
+            }, headers={"x-bench-user": str(rng.randrange(1, scale["users"] + 1))})
+            return response.status_code == 200
+
+        async def search_resources(i: int) -> bool:
+            response = await http.get("/resources/search", params={
+                "query": " ".join(rng.sample(WORDS, 2)), "limit": 20
+            }, headers={"x-bench-user": "1"})
+            return response.status_code == 200
+
+        async def register_for_event(i: int) -> bool:
+            response = await http.post("/events/register", params={
+                "event_id": rng.randrange(1, scale["events"] + 1)
+            }, headers={"x-bench-user": str(next(next_user))})
+            return response.status_code == 200
+
+        async def track_resource_view(i: int) -> bool:
+            response = await http.post("/resources/track-view", json={
+                "resource_id": rng.randrange(1, scale["resources"] + 1),
+                "ip_address": "127.0.0.1"
+            }, headers={"x-bench-user": str(rng.randrange(1, scale["users"] + 1))})
+            return response.status_code == 200
+
+        scenarios = {
+            "list_courses": list_courses,
+            "search_resources": search_resources,
+            "register_for_event": register_for_event,
+            "track_resource_view": track_resource_view,
+            "websocket_broadcast": await broadcast_scenario(scale["sockets"]),
+        }
+        if args.only:
+            scenarios = {name: scenarios[name] for name in args.only}
+
+        print(f"{'scenario':>20} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'queries':>8} {'errors':>6}")
+        results: Dict[str, dict] = {}
+        for name, call in scenarios.items():
+            # Broadcasts fan out to every socket; fewer rounds keep runs short
+            requests = max(args.requests // 20, 20) if name == "websocket_broadcast" else args.requests
+            clients = 1 if name == "websocket_broadcast" else args.clients
+            results[name] = await run_scenario(name, call, requests, clients, args.warmup)
+    await app.router.shutdown()
+
+    report = {
+        "meta": {
+            "scale": scale,
+            "clients": args.clients,
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        },
+        "scenarios": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        return compare(report, args.baseline, args.threshold)
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+def compare(report: dict, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["meta"]["scale"] != report["meta"]["scale"]:
+        print("WARNING: baseline was recorded at a different scale")
+
+    failures = []
+    for name, current in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        if current["errors"]:
+            failures.append(f"{name}: {current['errors']} failed requests")
+        if before["p95"] and current["p95"] > before["p95"] * (1 + threshold):
+            failures.append(f"{name}: p95 {current['p95']:.2f} ms vs {before['p95']:.2f} ms")
+        if current["throughput"] < before["throughput"] * (1 - threshold):
+            failures.append(f"{name}: {current['throughput']:.0f} req/s vs {before['throughput']:.0f}")
+        # Query counts are deterministic, so any increase is a regression
+        if current["queriesPerRequest"] > before["queriesPerRequest"] + 0.05:
+            failures.append(f"{name}: {current['queriesPerRequest']} queries/request "
+                            f"vs {before['queriesPerRequest']}")
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print("OK: no regressions against baseline" if not failures else
+          f"FAIL: {len(failures)} regression(s) beyond {threshold:.0%}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    for key in SCALES["small"]:
+        parser.add_argument(f"--{key}", type=int, default=None, help=f"override the scale's {key}")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--output", help="write this run's results as JSON")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--baseline", help="compare against this baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative slowdown before failing (default 0.2)")
+    sys.exit(asyncio.run(main(parser.parse_args())))
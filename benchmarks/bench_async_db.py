@@ -0,0 +1,105 @@
+"""Requests/sec and tail latency: blocking Session vs AsyncSession in async routes.
+
+Each simulated request runs the list_events query. The blocking variant
+uses a sync Session inside a coroutine the way the routes used to; the
+async variant goes through the AsyncSession pool. A ticker coroutine
+measures how late the event loop wakes up while the load runs.
+
+    python -m benchmarks.bench_async_db --url postgresql://localhost/bench --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from app.async_database import create_engine_for
+from app.database import Base
+from app.models.event import Event
+
+def upcoming_events():
+    return select(Event).where(Event.datetime > datetime.utcnow()).order_by(
+        Event.datetime, Event.id
+    ).limit(10)
+
+def seed(url: str, num_events: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Event), [
+            {
+                "title": f"Event {i}",
+                "datetime": now + timedelta(minutes=i),
+                "max_attendees": 100,
+                "current_attendees": 0,
+            } for i in range(num_events)
+        ])
+    return engine
+
+async def loop_lag(stop: asyncio.Event, interval: float = 0.005):
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+    return lags
+
+async def run(handler, concurrency: int, requests: int):
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            await handler()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = await lag_task
+
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "rps": requests / elapsed,
+        "p50": cuts[49],
+        "p99": cuts[98],
+        "loop_lag_p99": statistics.quantiles(lags, n=100)[98] if len(lags) > 1 else 0.0,
+    }
+
+async def main(url: str, concurrency: int, requests: int, num_events: int):
+    sync_engine = seed(url, num_events)
+    sync_sessions = sessionmaker(bind=sync_engine)
+    async_sessions = async_sessionmaker(create_engine_for(url), expire_on_commit=False)
+
+    async def blocking_handler():
+        with sync_sessions() as db:
+            db.scalars(upcoming_events()).all()
+
+    async def async_handler():
+        async with async_sessions() as db:
+            (await db.scalars(upcoming_events())).all()
+
+    print(f"{'variant':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'loop lag p99':>13}")
+    for name, handler in (("blocking", blocking_handler), ("async", async_handler)):
+        stats = await run(handler, concurrency, requests)
+        print(f"{name:>9} {stats['rps']:>9.0f} {stats['p50']:>8.2f} "
+              f"{stats['p99']:>8.2f} {stats['loop_lag_p99']:>13.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="sync database URL (default: temp SQLite file)")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=10000)
+    args = parser.parse_args()
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    asyncio.run(main(url, args.concurrency, args.requests, args.events))
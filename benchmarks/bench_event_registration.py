@@ -0,0 +1,95 @@
+"""Registration rush against one event: throughput and an overbooking check.
+
+Every simulated user registers concurrently (a share of them twice), each
+request on its own AsyncSession, then the script verifies that seats,
+registrations and the waitlist add up. Exits non-zero on overbooking.
+
+    python -m benchmarks.bench_event_registration --url postgresql://localhost/bench \\
+        --users 20000 --capacity 500 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.async_database import create_engine_for
+from app.database import Base
+from app.models.event import Event, EventRegistration, EventWaitlistEntry
+from app.services import event_registration
+
+def seed(url: str, capacity: int) -> int:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        result = conn.execute(insert(Event).values(
+            title="Registration rush",
+            datetime=datetime.utcnow() + timedelta(days=1),
+            max_attendees=capacity,
+            current_attendees=0
+        ))
+    engine.dispose()
+    return result.inserted_primary_key[0]
+
+async def main(url: str, users: int, capacity: int, concurrency: int, duplicate_rate: float):
+    event_id = seed(url, capacity)
+    sessions = async_sessionmaker(create_engine_for(url), expire_on_commit=False)
+
+    attempts = list(range(1, users + 1))
+    attempts += random.sample(attempts, int(users * duplicate_rate))
+    random.shuffle(attempts)
+    queue = iter(attempts)
+    outcomes = {"registered": 0, "waitlisted": 0, "duplicate": 0}
+
+    async def worker():
+        for user_id in queue:
+            async with sessions() as db:
+                try:
+                    result = await event_registration.register(db, event_id, user_id)
+                except event_registration.AlreadyRegistered:
+                    outcomes["duplicate"] += 1
+                    continue
+            outcomes["registered" if result.registered else "waitlisted"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    async with sessions() as db:
+        attendees = await db.scalar(select(Event.current_attendees).where(Event.id == event_id))
+        registrations = await db.scalar(
+            select(func.count()).where(EventRegistration.event_id == event_id)
+        )
+        waitlisted = await db.scalar(
+            select(func.count()).where(EventWaitlistEntry.event_id == event_id)
+        )
+
+    print(f"attempts:       {len(attempts)} in {elapsed:.2f}s "
+          f"({len(attempts) / elapsed:.0f} registrations/s)")
+    print(f"outcomes:       {outcomes}")
+    print(f"seats:          {attendees}/{capacity}, registrations {registrations}, "
+          f"waitlist {waitlisted}")
+
+    ok = (
+        attendees == registrations == min(users, capacity)
+        and waitlisted == max(users - capacity, 0)
+    )
+    print("OK: no overbooking" if ok else "FAIL: seat accounting is inconsistent")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="sync database URL (default: temp SQLite file)")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--capacity", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    sys.exit(asyncio.run(main(
+        url, args.users, args.capacity, args.concurrency, args.duplicate_rate
+    )))
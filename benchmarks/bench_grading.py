@@ -0,0 +1,109 @@
+"""Cohort grading and item statistics over synthetic attempts.
+
+Builds an answer key and simulated attempts in memory, where stronger
+students pick the right option more often. It then times a row-by-row
+Python grader against the compiled key: encoding, vectorized scoring and
+item statistics. It checks that both graders agree.
+
+    python -m benchmarks.bench_grading --attempts 100000 --questions 40
+"""
+import argparse
+import sys
+import time
+from types import SimpleNamespace
+import numpy as np
+from app.services.grading import (
+    compile_answer_key,
+    encode_answers,
+    item_statistics,
+    normalize_answer,
+    score_codes
+)
+
+def build(attempts: int, questions: int, options: int, seed: int):
+    rng = np.random.default_rng(seed)
+    labels = [f"Option {chr(65 + i)}" for i in range(options)]
+    key_rows = [
+        SimpleNamespace(id=q + 1, options=labels, correct_answer=labels[rng.integers(options)])
+        for q in range(questions)
+    ]
+    assessment = SimpleNamespace(id=1, passing_score=60)
+
+    ability = rng.normal(size=attempts)
+    hardness = rng.normal(size=questions)
+    p_right = 1 / (1 + np.exp(-(ability[:, None] - hardness[None, :])))
+    right = rng.random((attempts, questions)) < p_right
+    wrong_pick = rng.integers(options - 1, size=(attempts, questions))
+    skipped = rng.random((attempts, questions)) < 0.02
+
+    correct_index = [labels.index(q.correct_answer) for q in key_rows]
+    answer_sets = []
+    for i in range(attempts):
+        answers = {}
+        for j in range(questions):
+            if skipped[i, j]:
+                continue
+            if right[i, j]:
+                pick = correct_index[j]
+            else:
+                pick = wrong_pick[i, j] + (wrong_pick[i, j] >= correct_index[j])
+            answers[str(j + 1)] = labels[pick]
+        answer_sets.append(answers)
+    return assessment, key_rows, answer_sets
+
+def grade_row_by_row(questions, answer_sets):
+    scores = []
+    for answers in answer_sets:
+        right = 0
+        for question in questions:
+            given = answers.get(str(question.id))
+            if given is not None and normalize_answer(given) == normalize_answer(question.correct_answer):
+                right += 1
+        scores.append(right * 100.0 / len(questions))
+    return scores
+
+def main(attempts: int, questions: int, options: int, seed: int):
+    assessment, key_rows, answer_sets = build(attempts, questions, options, seed)
+
+    start = time.perf_counter()
+    legacy = grade_row_by_row(key_rows, answer_sets)
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    key = compile_answer_key(assessment, key_rows)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    codes = encode_answers(key, answer_sets)
+    encode_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores, passed = score_codes(key, codes)
+    score_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = item_statistics(key, codes)
+    stats_s = time.perf_counter() - start
+
+    print(f"attempts:          {attempts} x {questions} questions")
+    print(f"row by row:        {legacy_s * 1000:>8.1f} ms")
+    print(f"compile key:       {compile_s * 1000:>8.3f} ms")
+    print(f"encode answers:    {encode_s * 1000:>8.1f} ms")
+    print(f"vectorized score:  {score_s * 1000:>8.1f} ms  (pass rate {passed.mean():.1%})")
+    print(f"item statistics:   {stats_s * 1000:>8.1f} ms")
+    hardest = min(stats, key=lambda item: item["difficulty"])
+    print(f"hardest item:      #{hardest['questionId']} difficulty {hardest['difficulty']}, "
+          f"discrimination {hardest['discrimination']}")
+
+    ok = np.allclose(scores, legacy)
+    print("OK: vectorized scores match" if ok else "FAIL: scores differ")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=100000)
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    sys.exit(main(args.attempts, args.questions, args.options, args.seed))
@@ -0,0 +1,106 @@
+"""Query count and p95 latency of list_courses by page size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_list_courses --courses 5000 --iterations 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+from fastapi import Response
+from sqlalchemy import event, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models.course import Course
+from app.models.progress import CourseProgress
+from app.routes.courses import list_courses
+from app.services.catalog_cache import catalog_cache
+
+PAGE_SIZES = (10, 50, 100, 250)
+
+async def make_session(num_courses: int, user_id: int):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    db = async_sessionmaker(engine, expire_on_commit=False)()
+    await db.execute(insert(Course), [
+        {
+            "id": i,
+            "title": f"Course {i}",
+            "description": "Maternal and child health",
+            "category": "health",
+            "level": "beginner",
+            "enrolled_count": i % 97,
+        } for i in range(1, num_courses + 1)
+    ])
+    await db.execute(insert(CourseProgress), [
+        {"user_id": user_id, "course_id": i, "progress_percentage": 50.0}
+        for i in range(1, num_courses + 1, 2)
+    ])
+    await db.commit()
+
+    counter = {"queries": 0}
+    event.listen(
+        engine.sync_engine, "before_cursor_execute",
+        lambda *args, **kwargs: counter.__setitem__("queries", counter["queries"] + 1)
+    )
+    return db, counter
+
+async def legacy_list_courses(db, limit, user):
+    """The per-course progress lookup list_courses used to do"""
+    courses = (await db.scalars(
+        select(Course).order_by(Course.enrolled_count.desc()).limit(limit)
+    )).all()
+    for course in courses:
+        await db.scalar(select(CourseProgress).where(
+            CourseProgress.course_id == course.id,
+            CourseProgress.user_id == user.id
+        ))
+    return courses
+
+async def measure(call, counter, iterations):
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        before = counter["queries"]
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries += counter["queries"] - before
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    return queries / iterations, p95
+
+async def main(num_courses: int, iterations: int):
+    user = SimpleNamespace(id=1)
+    db, counter = await make_session(num_courses, user.id)
+
+    print(f"{'page':>6} {'variant':>8} {'queries':>9} {'p95 ms':>9}")
+    for page_size in PAGE_SIZES:
+        variants = {
+            "legacy": lambda: legacy_list_courses(db, page_size, user),
+            "cold": lambda: _cold(db, page_size, user),
+            "cached": lambda: list_courses(
+                response=Response(), cursor=None, limit=page_size, category=None, level=None,
+                search=None, sort_by="popular", db=db, current_user=user
+            ),
+        }
+        for name, call in variants.items():
+            queries, p95 = await measure(call, counter, iterations)
+            print(f"{page_size:>6} {name:>8} {queries:>9.1f} {p95:>9.3f}")
+
+async def _cold(db, page_size, user):
+    catalog_cache.invalidate()
+    return await list_courses(
+        response=Response(), cursor=None, limit=page_size, category=None, level=None,
+        search=None, sort_by="popular", db=db, current_user=user
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.courses, args.iterations))
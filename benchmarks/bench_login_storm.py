@@ -0,0 +1,73 @@
+"""Login storm: bcrypt verification throughput and event-loop latency.
+
+Fires concurrent password checks the way the login route would, while a
+probe task measures how late the event loop wakes it up every 10 ms. The
+inline variant calls bcrypt on the loop, as the old code did. The pool
+variant goes through PasswordHasher. Some logins use an old work factor
+and get rehashed on the way.
+
+    python -m benchmarks.bench_login_storm --logins 400 --concurrency 100 --rounds 10
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.security.data_protection import DataProtection, HashingBusy, PasswordHasher
+
+PROBE_INTERVAL = 0.01
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+async def storm(name: str, check, hashes, logins: int, concurrency: int):
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    queue = iter(range(logins))
+    outcomes = {"ok": 0, "busy": 0}
+
+    async def client():
+        for i in queue:
+            try:
+                await check("correct horse", hashes[i % len(hashes)])
+                outcomes["ok"] += 1
+            except HashingBusy:
+                outcomes["busy"] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    cuts = statistics.quantiles(lags, n=100) if len(lags) > 1 else [0.0] * 99
+    print(f"{name:>7} {outcomes['ok'] / elapsed:>9.1f} {cuts[49]:>8.1f} {cuts[98]:>8.1f} "
+          f"{max(lags, default=0.0):>8.1f} {outcomes['busy']:>6}")
+
+async def main(logins: int, concurrency: int, rounds: int, workers: int, max_pending: int):
+    # A quarter of the stored hashes use a lower cost and get upgraded
+    hashes = [DataProtection.hash_password("correct horse", rounds) for _ in range(3)]
+    hashes.append(DataProtection.hash_password("correct horse", max(4, rounds - 2)))
+
+    async def inline(password, hashed):
+        return DataProtection.verify_password(password, hashed)
+
+    hasher = PasswordHasher(rounds=rounds, max_workers=workers, max_pending=max_pending)
+
+    print(f"{'variant':>7} {'logins/s':>9} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'busy':>6}")
+    await storm("inline", inline, hashes, logins, concurrency)
+    await storm("pool", hasher.verify, hashes, logins, concurrency)
+    print(f"pool stats: {hasher.stats()}")
+    hasher.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency, args.rounds, args.workers, args.max_pending))
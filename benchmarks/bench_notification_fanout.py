@@ -0,0 +1,131 @@
+"""Course-wide notification fan-out against a local SMTP stub.
+
+Seeds users, then notifies all of them with NotificationService.send_bulk
+twice (the second call must coalesce to nothing). Measures the request
+side (inserts plus outbox rows) separately from draining the outbox with
+the job workers, and counts SMTP connections and messages seen by the
+stub. Exits non-zero if any user got a duplicate or missed an email.
+
+    python -m benchmarks.bench_notification_fanout --users 20000 --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.async_database import create_engine_for
+from app.database import Base
+from app.models.job import Job
+from app.models.user import User
+from app.services.job_queue import JobWorkerPool
+from app.services.mailer import smtp_pool
+from app.services.notification_service import Notification, NotificationService, NotificationType
+
+class SMTPStub:
+    """Just enough of RFC 5321 to accept mail and count it"""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        writer.write(b"220 stub ESMTP\r\n")
+        in_data = False
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if in_data:
+                if line == b".\r\n":
+                    in_data = False
+                    self.messages += 1
+                    writer.write(b"250 OK\r\n")
+                continue
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                writer.write(b"250-stub\r\n250 8BITMIME\r\n")
+            elif verb == b"DATA":
+                in_data = True
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif verb == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+def seed(url: str, users: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"user{i}@example.com"} for i in range(1, users + 1)
+        ])
+    engine.dispose()
+
+async def main(url: str, users: int, workers: int):
+    seed(url, users)
+    stub = SMTPStub()
+    server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+    smtp_pool.host, smtp_pool.port = server.sockets[0].getsockname()[:2]
+    sessions = async_sessionmaker(create_engine_for(url), expire_on_commit=False)
+    user_ids = list(range(1, users + 1))
+
+    async with sessions() as db:
+        start = time.perf_counter()
+        created = await NotificationService(db).send_bulk(
+            user_ids, NotificationType.COURSE_UPDATE, "New module", "Module 4 is live"
+        )
+        request_s = time.perf_counter() - start
+        again = await NotificationService(db).send_bulk(
+            user_ids, NotificationType.COURSE_UPDATE, "New module", "Module 4 is live"
+        )
+
+    pool = JobWorkerPool(session_factory=sessions, concurrency=workers, poll_interval=0.05)
+    start = time.perf_counter()
+    pool.start()
+    while True:
+        async with sessions() as db:
+            remaining = await db.scalar(
+                select(func.count()).where(Job.status.in_(["pending", "running"]))
+            )
+        if not remaining:
+            break
+        await asyncio.sleep(0.05)
+    drain_s = time.perf_counter() - start
+    await pool.stop()
+    smtp_pool.close()
+    server.close()
+
+    async with sessions() as db:
+        stored = await db.scalar(select(func.count()).select_from(Notification))
+        emailed = await db.scalar(
+            select(func.count()).where(Notification.emailed_at.is_not(None))
+        )
+
+    print(f"send_bulk:   {created} notifications in {request_s * 1000:.0f} ms "
+          f"(coalesced repeat created {again})")
+    print(f"drain:       {drain_s:.2f}s with {workers} workers "
+          f"({stub.messages / drain_s:.0f} emails/s)")
+    print(f"smtp stub:   {stub.messages} messages over {stub.connections} connections")
+    print(f"jobs:        processed {pool.processed}, retried {pool.retried}, "
+          f"failed {pool.failed}")
+
+    ok = created == stored == emailed == stub.messages == users and again == 0
+    print("OK: one notification and one email per user" if ok else "FAIL: counts disagree")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="sync database URL (default: temp SQLite file)")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    sys.exit(asyncio.run(main(url, args.users, args.workers)))
@@ -0,0 +1,74 @@
+"""Radius and k-nearest facility queries at 100k facilities.
+
+Compares the grid index with a brute-force haversine scan and checks
+that both return the same facilities.
+
+    python -m benchmarks.bench_spatial_index --facilities 100000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import time
+from app.services.spatial_index import SpatialIndex, haversine_km
+
+# Roughly East Africa, where most facilities are clustered
+BOUNDS = (-12.0, 5.0, 28.0, 42.0)
+
+def random_point(rng):
+    min_lat, max_lat, min_lon, max_lon = BOUNDS
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+
+def brute_force(points, lat, lon, radius_km=None, k=None):
+    distances = sorted(
+        (haversine_km(lat, lon, plat, plon), pid) for pid, (plat, plon) in points.items()
+    )
+    if radius_km is not None:
+        return [pid for d, pid in distances if d <= radius_km]
+    return [pid for _, pid in distances[:k]]
+
+def timed(fn, queries):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(*query))
+        timings.append((time.perf_counter() - start) * 1000)
+    cuts = statistics.quantiles(timings, n=100)
+    return cuts[49], cuts[94], results
+
+def main(num_facilities: int, num_queries: int, radius_km: float, k: int):
+    rng = random.Random(42)
+    points = {i: random_point(rng) for i in range(num_facilities)}
+
+    start = time.perf_counter()
+    index = SpatialIndex()
+    for pid, (lat, lon) in points.items():
+        index.upsert(pid, lat, lon)
+    print(f"built index over {len(index)} facilities in {time.perf_counter() - start:.2f}s")
+
+    queries = [random_point(rng) for _ in range(num_queries)]
+    brute_queries = queries[:max(num_queries // 20, 5)]
+
+    print(f"{'query':>16} {'p50 ms':>9} {'p95 ms':>9}")
+    p50, p95, indexed = timed(lambda lat, lon: index.within(lat, lon, radius_km), queries)
+    print(f"{'radius index':>16} {p50:>9.3f} {p95:>9.3f}")
+    p50, p95, scanned = timed(
+        lambda lat, lon: brute_force(points, lat, lon, radius_km=radius_km), brute_queries
+    )
+    print(f"{'radius scan':>16} {p50:>9.3f} {p95:>9.3f}")
+    assert all([pid for pid, _ in a] == b for a, b in zip(indexed, scanned))
+
+    p50, p95, indexed = timed(lambda lat, lon: index.nearest(lat, lon, k), queries)
+    print(f"{'knn index':>16} {p50:>9.3f} {p95:>9.3f}")
+    p50, p95, scanned = timed(lambda lat, lon: brute_force(points, lat, lon, k=k), brute_queries)
+    print(f"{'knn scan':>16} {p50:>9.3f} {p95:>9.3f}")
+    assert all([pid for pid, _ in a] == b for a, b in zip(indexed, scanned))
+    print("index results match brute force")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facilities", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius", type=float, default=10.0)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+    main(args.facilities, args.queries, args.radius, args.k)
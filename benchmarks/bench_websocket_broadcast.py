@@ -0,0 +1,77 @@
+"""Broadcast latency with many simulated sockets, some of them slow.
+
+Compares the old serial send_json loop with ConnectionManager's queued
+fan-out. Latency is measured from the broadcast call until each fast
+socket has received the message.
+
+    python -m benchmarks.bench_websocket_broadcast --sockets 10000 --slow 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.websockets.connection_manager import ConnectionManager
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def _deliver(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append((time.perf_counter(), message))
+
+    async def send_text(self, data: str):
+        await self._deliver(data)
+
+    async def send_json(self, data: dict):
+        await self._deliver(data)
+
+def summarize(name: str, sent_at: float, call_ms: float, sockets):
+    latencies = [(ts - sent_at) * 1000 for s in sockets for ts, _ in s.received[-1:]]
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{name:>8} {call_ms:>10.2f} {cuts[49]:>9.2f} {cuts[98]:>9.2f} "
+          f"{len(latencies):>10}")
+
+async def legacy_broadcast(sockets, message):
+    for socket in sockets:
+        await socket.send_json(message)
+
+async def main(num_sockets: int, num_slow: int, slow_delay: float):
+    message = {"type": "chat_message", "user": "bench", "message": "x" * 200}
+    print(f"{'variant':>8} {'call ms':>10} {'p50 ms':>9} {'p99 ms':>9} {'delivered':>10}")
+
+    sockets = [FakeWebSocket(slow_delay if i < num_slow else 0.0) for i in range(num_sockets)]
+    fast = sockets[num_slow:]
+    start = time.perf_counter()
+    await legacy_broadcast(sockets, message)
+    summarize("serial", start, (time.perf_counter() - start) * 1000, fast)
+
+    manager = ConnectionManager(max_queue_size=64, send_timeout=slow_delay * 4)
+    sockets = [FakeWebSocket(slow_delay if i < num_slow else 0.0) for i in range(num_sockets)]
+    fast = sockets[num_slow:]
+    for user_id, socket in enumerate(sockets):
+        await manager.connect(socket, user_id)
+
+    start = time.perf_counter()
+    await manager.broadcast(message)
+    call_ms = (time.perf_counter() - start) * 1000
+    while any(not s.received for s in fast):
+        await asyncio.sleep(0)
+    summarize("fan-out", start, call_ms, fast)
+    print(f"queued for slow clients: {manager.queue_depth()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.sockets, args.slow, args.slow_delay))